@@ -123,6 +123,10 @@ func main() {
 	stopAbuseBroadcast := make(chan struct{})
 	go backgroundSyncAbuseBroadcast(stopAbuseBroadcast)
 
+	// IP monitoring lists: refresh recently viewed ones before their cache expires
+	stopIPWarm := make(chan struct{})
+	go backgroundWarmIPMonitoring(stopIPWarm)
+
 	// ========== 8. Start server with graceful shutdown ==========
 	srv := &http.Server{
 		Addr:         cfg.ServerAddr(),
@@ -150,6 +154,7 @@ func main() {
 	// Stop background tasks
 	close(stopIPEnforce)
 	close(stopAbuseBroadcast)
+	close(stopIPWarm)
 
 	// Give the server 10 seconds to finish processing requests
 	ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
@@ -229,6 +234,30 @@ func enforceIPRecordingOnce() {
 	logger.L.Success(fmt.Sprintf("[IP记录] %s", result["message"]))
 }
 
+// backgroundWarmIPMonitoring keeps recently requested IP monitoring lists in
+// cache by recomputing them shortly before they expire.
+func backgroundWarmIPMonitoring(stop <-chan struct{}) {
+	defer func() {
+		if r := recover(); r != nil {
+			logger.L.Error(fmt.Sprintf("[IP监控] 缓存预热任务 panic: %v", r))
+		}
+	}()
+
+	ticker := time.NewTicker(service.IPMonitoringWarmInterval)
+	defer ticker.Stop()
+
+	for {
+		select {
+		case <-ticker.C:
+			if n := service.WarmIPMonitoringCache(); n > 0 {
+				logger.L.Debug(fmt.Sprintf("[IP监控] 已预热 %d 个列表缓存", n))
+			}
+		case <-stop:
+			return
+		}
+	}
+}
+
 // backgroundSyncAbuseBroadcast supervises the Hub pull loop. It re-reads the
 // runtime settings on every tick so admins can toggle enabled/interval from the
 // frontend without a restart.
@@ -3,6 +3,7 @@ package auth
 import (
 	"crypto/subtle"
 	"fmt"
+	"sync"
 	"time"
 
 	"github.com/golang-jwt/jwt/v5"
@@ -37,8 +38,30 @@ func GenerateToken(subject string) (string, time.Time, error) {
 	return tokenString, expiresAt, nil
 }
 
-// ValidateToken validates a JWT token and returns the claims
+// validatedToken is a token that passed ValidateToken, held until it expires.
+type validatedToken struct {
+	claims    *Claims
+	expiresAt time.Time
+}
+
+// validatedTokens caches validated tokens by token string, so the burst of
+// requests a dashboard refresh sends with one token parses and verifies its
+// signature once. Only tokens that verified are stored, and each is dropped
+// once it expires, so the cache holds at most the live tokens issued by Login.
+var validatedTokens sync.Map
+
+// ValidateToken validates a JWT token and returns the claims. The returned
+// claims may be shared between callers and must not be modified.
 func ValidateToken(tokenString string) (*Claims, error) {
+	now := time.Now()
+	if v, ok := validatedTokens.Load(tokenString); ok {
+		entry := v.(*validatedToken)
+		if now.Before(entry.expiresAt) {
+			return entry.claims, nil
+		}
+		validatedTokens.Delete(tokenString)
+	}
+
 	cfg := config.Get()
 
 	token, err := jwt.ParseWithClaims(tokenString, &Claims{}, func(token *jwt.Token) (interface{}, error) {
@@ -54,12 +77,27 @@ func ValidateToken(tokenString string) (*Claims, error) {
 	}
 
 	if claims, ok := token.Claims.(*Claims); ok && token.Valid {
+		if claims.ExpiresAt != nil {
+			sweepValidatedTokens(now)
+			validatedTokens.Store(tokenString, &validatedToken{claims: claims, expiresAt: claims.ExpiresAt.Time})
+		}
 		return claims, nil
 	}
 
 	return nil, fmt.Errorf("invalid token claims")
 }
 
+// sweepValidatedTokens drops expired tokens that were never presented again.
+// It runs only when a newly verified token is cached, which is rare.
+func sweepValidatedTokens(now time.Time) {
+	validatedTokens.Range(func(key, value interface{}) bool {
+		if !now.Before(value.(*validatedToken).expiresAt) {
+			validatedTokens.Delete(key)
+		}
+		return true
+	})
+}
+
 // VerifyPassword checks if the provided password matches the admin password
 // Uses constant-time comparison to prevent timing attacks
 func VerifyPassword(password string) bool {
@@ -2,17 +2,25 @@ package cache
 
 import (
 	"context"
-	"encoding/json"
+	"crypto/rand"
+	"encoding/hex"
 	"fmt"
 	"strings"
 	"sync"
 	"sync/atomic"
 	"time"
 
+	"github.com/bytedance/sonic"
 	"github.com/new-api-tools/backend/internal/logger"
 	"github.com/redis/go-redis/v9"
 )
 
+// cacheJSON encodes and decodes cached values. Every Set and GetJSON goes
+// through it, so it uses sonic's SIMD/JIT codec, configured to match
+// encoding/json output and semantics (sorted map keys, HTML escaping, UTF-8
+// validation); sonic falls back to encoding/json on unsupported platforms.
+var cacheJSON = sonic.ConfigStd
+
 // localEntry wraps cached data with an expiry time
 type localEntry struct {
 	data      []byte
@@ -34,6 +42,9 @@ type Manager struct {
 	localCache sync.Map // level-1 local cache (stores *localEntry)
 	ctx        context.Context
 
+	// instanceID tags this process's invalidation messages so it can skip its own
+	instanceID string
+
 	// Stats — use atomic for lock-free incrementing
 	hits   int64
 	misses int64
@@ -66,14 +77,21 @@ func Init(connString string) (*Manager, error) {
 		return nil, fmt.Errorf("redis connection failed: %w", err)
 	}
 
+	idBytes := make([]byte, 8)
+	_, _ = rand.Read(idBytes)
+
 	mgr = &Manager{
-		rdb: rdb,
-		ctx: ctx,
+		rdb:        rdb,
+		ctx:        ctx,
+		instanceID: hex.EncodeToString(idBytes),
 	}
 
 	// Start local cache cleanup goroutine
 	go mgr.cleanupExpiredEntries()
 
+	// Follow other instances' invalidations
+	go mgr.subscribeInvalidations()
+
 	logger.L.System("Redis 连接成功")
 	return mgr, nil
 }
@@ -127,11 +145,16 @@ func (m *Manager) RedisClient() *redis.Client {
 // Set stores a value in both local and Redis cache
 func (m *Manager) Set(key string, value interface{}, ttl time.Duration) error {
 	// Serialize value
-	data, err := json.Marshal(value)
+	data, err := cacheJSON.Marshal(value)
 	if err != nil {
 		return fmt.Errorf("failed to serialize cache value: %w", err)
 	}
+	return m.SetRaw(key, data, ttl)
+}
 
+// SetRaw stores already-encoded JSON in both local and Redis cache. data is
+// kept as is, so callers must not modify it afterwards.
+func (m *Manager) SetRaw(key string, data []byte, ttl time.Duration) error {
 	// Store in local cache with TTL
 	entry := &localEntry{data: data}
 	if ttl > 0 {
@@ -153,7 +176,7 @@ func (m *Manager) GetJSON(key string, dest interface{}) (bool, error) {
 		if entry, ok := val.(*localEntry); ok {
 			if !entry.isExpired() {
 				atomic.AddInt64(&m.hits, 1)
-				return true, json.Unmarshal(entry.data, dest)
+				return true, cacheJSON.Unmarshal(entry.data, dest)
 			}
 			// Expired — remove from local cache
 			m.localCache.Delete(key)
@@ -185,7 +208,7 @@ func (m *Manager) GetJSON(key string, dest interface{}) (bool, error) {
 
 	atomic.AddInt64(&m.hits, 1)
 
-	return true, json.Unmarshal(data, dest)
+	return true, cacheJSON.Unmarshal(data, dest)
 }
 
 // GetString retrieves a string value from cache
@@ -259,6 +282,16 @@ func (m *Manager) DeleteByPrefix(prefix string) (int64, error) {
 	return deleted, nil
 }
 
+// SetNX stores value in Redis only if key does not exist yet, for use as a
+// short-lived lock. Without Redis it always succeeds: there is no other instance
+// to coordinate with.
+func (m *Manager) SetNX(key string, value interface{}, ttl time.Duration) (bool, error) {
+	if m.rdb == nil {
+		return true, nil
+	}
+	return m.rdb.SetNX(m.ctx, key, value, ttl).Result()
+}
+
 // Exists checks if a key exists in cache
 func (m *Manager) Exists(key string) (bool, error) {
 	if m.rdb == nil {
@@ -279,6 +312,57 @@ func (m *Manager) ClearAll() (int64, error) {
 	return m.DeleteByPrefix("cache:")
 }
 
+// ========== Invalidation ==========
+
+// invalidationChannel is the Redis pub/sub channel on which instances announce
+// keys they have rewritten, so peers drop their local copies right away instead
+// of serving them until the local TTL lapses.
+const invalidationChannel = "cache:invalidate"
+
+var (
+	invalidationMu       sync.RWMutex
+	invalidationHandlers []func(key string)
+)
+
+// OnInvalidate registers fn to run when another instance invalidates a key, for
+// callers that keep their own in-process copies. Handlers run on the subscriber
+// goroutine and must not block.
+func OnInvalidate(fn func(key string)) {
+	invalidationMu.Lock()
+	defer invalidationMu.Unlock()
+	invalidationHandlers = append(invalidationHandlers, fn)
+}
+
+// PublishInvalidation tells other instances that key has been rewritten.
+func (m *Manager) PublishInvalidation(key string) error {
+	if m.rdb == nil {
+		return nil
+	}
+	return m.rdb.Publish(m.ctx, invalidationChannel, m.instanceID+"|"+key).Err()
+}
+
+// subscribeInvalidations drops local entries named by other instances'
+// invalidation messages and forwards them to registered handlers.
+func (m *Manager) subscribeInvalidations() {
+	sub := m.rdb.Subscribe(m.ctx, invalidationChannel)
+	defer sub.Close()
+
+	for msg := range sub.Channel() {
+		origin, key, ok := strings.Cut(msg.Payload, "|")
+		if !ok || origin == m.instanceID {
+			continue
+		}
+		m.localCache.Delete(key)
+
+		invalidationMu.RLock()
+		handlers := invalidationHandlers
+		invalidationMu.RUnlock()
+		for _, fn := range handlers {
+			fn(key)
+		}
+	}
+}
+
 // ========== Stats ==========
 
 // Stats returns cache statistics
@@ -307,20 +391,21 @@ func (m *Manager) Stats() map[string]interface{} {
 		"local_count": localCount,
 	}
 
-	// Try to get Redis memory info (skip if not connected)
+	// Fetch Redis memory info and key count in one round trip (skip if not connected)
 	if m.rdb != nil {
-		memInfo, err := m.rdb.Info(m.ctx, "memory").Result()
-		if err == nil {
+		pipe := m.rdb.Pipeline()
+		memCmd := pipe.Info(m.ctx, "memory")
+		sizeCmd := pipe.DBSize(m.ctx)
+		_, _ = pipe.Exec(m.ctx)
+
+		if memInfo, err := memCmd.Result(); err == nil {
 			for _, line := range strings.Split(memInfo, "\r\n") {
 				if strings.HasPrefix(line, "used_memory_human:") {
 					info["redis_memory"] = strings.TrimPrefix(line, "used_memory_human:")
 				}
 			}
 		}
-
-		// Get key count
-		dbSize, err := m.rdb.DBSize(m.ctx).Result()
-		if err == nil {
+		if dbSize, err := sizeCmd.Result(); err == nil {
 			info["redis_keys"] = dbSize
 		}
 	}
@@ -335,7 +420,7 @@ func (m *Manager) HSet(key, field string, value interface{}) error {
 	if m.rdb == nil {
 		return nil
 	}
-	data, err := json.Marshal(value)
+	data, err := cacheJSON.Marshal(value)
 	if err != nil {
 		return err
 	}
@@ -354,7 +439,7 @@ func (m *Manager) HGet(key, field string, dest interface{}) (bool, error) {
 	if err != nil {
 		return false, err
 	}
-	return true, json.Unmarshal(data, dest)
+	return true, cacheJSON.Unmarshal(data, dest)
 }
 
 // HGetString retrieves a string field from a Redis hash
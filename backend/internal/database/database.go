@@ -4,6 +4,7 @@ import (
 	"context"
 	"fmt"
 	"strings"
+	"sync"
 	"time"
 
 	"github.com/jmoiron/sqlx"
@@ -21,6 +22,13 @@ type Manager struct {
 	Config *config.Config
 	IsPG   bool
 	IsCH   bool
+
+	// stmts caches prepared statements (*sqlx.Stmt) by SQL text for
+	// QueryPreparedWithTimeout
+	stmts sync.Map
+
+	// rebound caches RebindStatic results by source SQL text
+	rebound sync.Map
 }
 
 // Global database manager
@@ -185,21 +193,53 @@ func (m *Manager) QueryWithTimeout(timeout time.Duration, query string, args ...
 	}
 	defer rows.Close()
 
-	var results []map[string]interface{}
-	for rows.Next() {
-		row := make(map[string]interface{})
-		if err := rows.MapScan(row); err != nil {
-			return nil, err
-		}
-		for k, v := range row {
-			if b, ok := v.([]byte); ok {
-				row[k] = string(b)
-			}
-		}
-		results = append(results, row)
+	return scanRowMaps(rows)
+}
+
+// QueryPreparedWithTimeout is QueryWithTimeout for constant SQL that runs often.
+// On MySQL the statement is prepared once and reused instead of being prepared
+// and closed around every call. pgx already caches prepared statements per
+// connection and ClickHouse has no server-side prepare, so those run a plain
+// query. Only pass fixed SQL text: each distinct text stays prepared. SQL
+// assembled per call, such as IN lists sized to a batch or the panel
+// whitelist filter, belongs on QueryWithTimeout on every engine.
+func (m *Manager) QueryPreparedWithTimeout(timeout time.Duration, query string, args ...interface{}) ([]map[string]interface{}, error) {
+	if m.IsPG || m.IsCH {
+		return m.QueryWithTimeout(timeout, query, args...)
 	}
 
-	return results, rows.Err()
+	stmt, err := m.preparedStmt(query)
+	if err != nil {
+		return nil, err
+	}
+
+	ctx, cancel := context.WithTimeout(context.Background(), timeout)
+	defer cancel()
+
+	rows, err := stmt.QueryxContext(ctx, args...)
+	if err != nil {
+		return nil, err
+	}
+	defer rows.Close()
+
+	return scanRowMaps(rows)
+}
+
+// preparedStmt returns the cached prepared statement for query, preparing it on
+// first use.
+func (m *Manager) preparedStmt(query string) (*sqlx.Stmt, error) {
+	if v, ok := m.stmts.Load(query); ok {
+		return v.(*sqlx.Stmt), nil
+	}
+	stmt, err := m.DB.Preparex(query)
+	if err != nil {
+		return nil, err
+	}
+	if v, loaded := m.stmts.LoadOrStore(query, stmt); loaded {
+		stmt.Close()
+		return v.(*sqlx.Stmt), nil
+	}
+	return stmt, nil
 }
 
 // Query executes a query that returns rows
@@ -210,16 +250,35 @@ func (m *Manager) Query(query string, args ...interface{}) ([]map[string]interfa
 	}
 	defer rows.Close()
 
+	return scanRowMaps(rows)
+}
+
+// scanRowMaps reads every row into a map keyed by column name, converting
+// []byte values to string for readability. Unlike sqlx's MapScan it resolves
+// the column list and the scan destinations once per result set rather than
+// once per row, and sizes each map up front.
+func scanRowMaps(rows *sqlx.Rows) ([]map[string]interface{}, error) {
+	columns, err := rows.Columns()
+	if err != nil {
+		return nil, err
+	}
+	values := make([]interface{}, len(columns))
+	dest := make([]interface{}, len(columns))
+	for i := range values {
+		dest[i] = &values[i]
+	}
+
 	var results []map[string]interface{}
 	for rows.Next() {
-		row := make(map[string]interface{})
-		if err := rows.MapScan(row); err != nil {
+		if err := rows.Scan(dest...); err != nil {
 			return nil, err
 		}
-		// Convert []byte to string for readability
-		for k, v := range row {
-			if b, ok := v.([]byte); ok {
-				row[k] = string(b)
+		row := make(map[string]interface{}, len(columns))
+		for i, col := range columns {
+			if b, ok := values[i].([]byte); ok {
+				row[col] = string(b)
+			} else {
+				row[col] = values[i]
 			}
 		}
 		results = append(results, row)
@@ -297,6 +356,19 @@ func (m *Manager) RebindQuery(query string) string {
 	return m.DB.Rebind(query)
 }
 
+// RebindStatic is RebindQuery for fixed statement text such as package-level
+// SQL constants: the dialect conversion runs once per statement and is reused
+// afterwards. Queries assembled per call should use RebindQuery, as every
+// distinct text stays cached.
+func (m *Manager) RebindStatic(query string) string {
+	if v, ok := m.rebound.Load(query); ok {
+		return v.(string)
+	}
+	bound := m.RebindQuery(query)
+	m.rebound.Store(query, bound)
+	return bound
+}
+
 // QuoteIdentifier quotes a single column or table identifier for the current SQL dialect.
 func (m *Manager) QuoteIdentifier(name string) string {
 	if m.IsPG {
@@ -317,6 +389,17 @@ func (m *Manager) StringAggDistinct(expr string) string {
 	return fmt.Sprintf("GROUP_CONCAT(DISTINCT %s)", expr)
 }
 
+// ApproxCountDistinct returns a distinct count expression for ranking and
+// threshold filters. ClickHouse uses its sampling-based uniq(), which keeps
+// small cardinalities exact and is far cheaper than a full hash set on large
+// groups; other engines have no built-in equivalent and count exactly.
+func (m *Manager) ApproxCountDistinct(expr string) string {
+	if m.IsCH {
+		return fmt.Sprintf("uniq(%s)", expr)
+	}
+	return fmt.Sprintf("COUNT(DISTINCT %s)", expr)
+}
+
 // CountDistinctNonEmpty returns a distinct count expression that ignores empty strings.
 func (m *Manager) CountDistinctNonEmpty(expr string) string {
 	if m.IsCH {
@@ -14,4 +14,7 @@ func TestClickHouseDialectHelpers(t *testing.T) {
 	if got, want := m.CountDistinctNonEmpty("l.ip"), "uniqExactIf(l.ip, length(l.ip) > 0)"; got != want {
 		t.Fatalf("CountDistinctNonEmpty() = %q, want %q", got, want)
 	}
+	if got, want := m.ApproxCountDistinct("l.ip"), "uniq(l.ip)"; got != want {
+		t.Fatalf("ApproxCountDistinct() = %q, want %q", got, want)
+	}
 }
@@ -211,10 +211,5 @@ func GetIPGeoBatch(c *gin.Context) {
 		}
 	}
 
-	geoMap := service.LookupIPGeoBatch(ips)
-	results := make([]map[string]interface{}, 0, len(ips))
-	for _, ip := range ips {
-		results = append(results, service.FormatIPGeoInfo(geoMap[ip]))
-	}
-	c.JSON(http.StatusOK, gin.H{"success": true, "data": results})
+	c.JSON(http.StatusOK, gin.H{"success": true, "data": service.LookupIPGeoList(ips)})
 }
@@ -16,6 +16,7 @@ import (
 	"path/filepath"
 	"sort"
 	"strings"
+	"sync"
 	"time"
 
 	"github.com/new-api-tools/backend/internal/config"
@@ -255,14 +256,10 @@ func (s *AbuseBroadcastService) Status(ctx context.Context) (AbuseBroadcastStatu
 		StorePath: s.storePath(),
 	}
 
-	db, err := s.openStore()
+	db, err := s.readStore(ctx)
 	if err != nil {
 		return status, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return status, err
-	}
 	settings, err := loadAbuseSettings(ctx, db)
 	if err != nil {
 		return status, err
@@ -281,24 +278,17 @@ func (s *AbuseBroadcastService) Status(ctx context.Context) (AbuseBroadcastStatu
 	status.Cursor = state.Cursor
 	status.LastSyncAt = state.LastSyncAt
 	status.LastError = state.LastError
-	status.Reports = countAbuseRows(ctx, db, "abuse_broadcast_reports")
-	status.Identities = countAbuseRows(ctx, db, "abuse_broadcast_identities")
-	status.UnreadReports = countUnreadAbuseReports(ctx, db)
-	status.OutgoingReports = countAbuseRows(ctx, db, "abuse_broadcast_outgoing_reports")
+	status.Reports, status.Identities, status.UnreadReports, status.OutgoingReports = countAbuseStoreRows(ctx, db)
 	return status, nil
 }
 
 // GetSettings returns current Hub access settings (without exposing the secret value).
 func (s *AbuseBroadcastService) GetSettings(ctx context.Context) (AbuseBroadcastSettings, error) {
 	var view AbuseBroadcastSettings
-	db, err := s.openStore()
+	db, err := s.readStore(ctx)
 	if err != nil {
 		return view, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return view, err
-	}
 	settings, err := loadAbuseSettings(ctx, db)
 	if err != nil {
 		return view, err
@@ -315,14 +305,10 @@ func (s *AbuseBroadcastService) GetSettings(ctx context.Context) (AbuseBroadcast
 // UpdateSettings applies a partial settings update. Fields with nil pointers are unchanged.
 // For Secret: nil = unchanged, empty string = clear, non-empty = replace.
 func (s *AbuseBroadcastService) UpdateSettings(ctx context.Context, input AbuseBroadcastSettingsInput) (AbuseBroadcastSettings, error) {
-	db, err := s.openStore()
+	db, err := s.store(ctx)
 	if err != nil {
 		return AbuseBroadcastSettings{}, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return AbuseBroadcastSettings{}, err
-	}
 	settings, err := loadAbuseSettings(ctx, db)
 	if err != nil {
 		return AbuseBroadcastSettings{}, err
@@ -434,14 +420,10 @@ func (s *AbuseBroadcastService) syncOnce(ctx context.Context, settings abuseSett
 		return result, fmt.Errorf("Hub URL、节点名称和密钥未配置")
 	}
 
-	db, err := s.openStore()
+	db, err := s.store(ctx)
 	if err != nil {
 		return result, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return result, err
-	}
 
 	state, err := getAbuseSyncState(ctx, db, settings.HubURL)
 	if err != nil {
@@ -463,6 +445,8 @@ func (s *AbuseBroadcastService) syncOnce(ctx context.Context, settings abuseSett
 	}
 	defer tx.Rollback()
 
+	reports := make([]AbuseBroadcastReport, 0, len(pull.Events))
+	identitiesByEvent := make([][]AbuseBroadcastIdentity, 0, len(pull.Events))
 	for _, event := range pull.Events {
 		report, identities, err := reportFromEvent(event)
 		if err != nil {
@@ -475,10 +459,14 @@ func (s *AbuseBroadcastService) syncOnce(ctx context.Context, settings abuseSett
 			continue
 		}
 		report.SyncedAt = now
-		if err := upsertAbuseReport(ctx, tx, report); err != nil {
-			return result, err
-		}
-		if err := replaceAbuseIdentities(ctx, tx, report.ReportID, identities); err != nil {
+		reports = append(reports, report)
+		identitiesByEvent = append(identitiesByEvent, identities)
+	}
+	if err := upsertAbuseReports(ctx, tx, reports); err != nil {
+		return result, err
+	}
+	for i, report := range reports {
+		if err := replaceAbuseIdentities(ctx, tx, report.ReportID, identitiesByEvent[i]); err != nil {
 			return result, err
 		}
 		result.StoredReports++
@@ -493,6 +481,12 @@ func (s *AbuseBroadcastService) syncOnce(ctx context.Context, settings abuseSett
 	if err := tx.Commit(); err != nil {
 		return result, err
 	}
+	if result.StoredReports > 0 {
+		// Refresh planner statistics if the batch shifted them, and release the
+		// pages freed by replaced identities; both are no-ops otherwise.
+		_, _ = db.ExecContext(ctx, "PRAGMA optimize")
+		_, _ = db.ExecContext(ctx, "PRAGMA incremental_vacuum")
+	}
 	return result, nil
 }
 
@@ -500,26 +494,22 @@ func (s *AbuseBroadcastService) ListReports(ctx context.Context, limit int) ([]A
 	if limit <= 0 || limit > 200 {
 		limit = 50
 	}
-	db, err := s.openStore()
+	db, err := s.readStore(ctx)
 	if err != nil {
 		return nil, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
+
+	stmt, err := prepareAbuseStmt(ctx, db, abuseReportsPageSQL)
+	if err != nil {
 		return nil, err
 	}
-
-	rows, err := db.QueryContext(ctx, `
-		SELECT report_id, reporter_node_id, reason, severity, status, description, evidence_summary, raw, created_at, updated_at, synced_at, read_at, matched_at
-		FROM abuse_broadcast_reports
-		ORDER BY synced_at DESC, created_at DESC
-		LIMIT ?`, limit)
+	rows, err := stmt.QueryContext(ctx, limit)
 	if err != nil {
 		return nil, err
 	}
 	defer rows.Close()
 
-	reports := make([]AbuseBroadcastReport, 0)
+	reports := make([]AbuseBroadcastReport, 0, limit)
 	for rows.Next() {
 		var report AbuseBroadcastReport
 		if err := rows.Scan(
@@ -545,12 +535,19 @@ func (s *AbuseBroadcastService) ListReports(ctx context.Context, limit int) ([]A
 		return nil, err
 	}
 
+	reportIDs := make([]string, len(reports))
 	for i := range reports {
-		identities, err := listAbuseIdentities(ctx, db, reports[i].ReportID)
-		if err != nil {
-			return nil, err
+		reportIDs[i] = reports[i].ReportID
+	}
+	identities, err := listAbuseIdentitiesByReport(ctx, db, reportIDs)
+	if err != nil {
+		return nil, err
+	}
+	for i := range reports {
+		reports[i].Identities = identities[reports[i].ReportID]
+		if reports[i].Identities == nil {
+			reports[i].Identities = make([]AbuseBroadcastIdentity, 0)
 		}
-		reports[i].Identities = identities
 	}
 	return reports, nil
 }
@@ -614,14 +611,10 @@ func (s *AbuseBroadcastService) ReportUser(ctx context.Context, req AbuseBroadca
 	result.LocalReportID = localReportID
 	result.Status = "pending"
 
-	db, err := s.openStore()
+	db, err := s.store(ctx)
 	if err != nil {
 		return result, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return result, err
-	}
 	if err := insertOutgoingReport(ctx, db, AbuseBroadcastOutgoingReport{
 		LocalReportID: localReportID,
 		LocalUserID:   req.UserID,
@@ -660,26 +653,22 @@ func (s *AbuseBroadcastService) ListOutgoingReports(ctx context.Context, limit i
 	if limit <= 0 || limit > 200 {
 		limit = 50
 	}
-	db, err := s.openStore()
+	db, err := s.readStore(ctx)
 	if err != nil {
 		return nil, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
+
+	stmt, err := prepareAbuseStmt(ctx, db, abuseOutgoingPageSQL)
+	if err != nil {
 		return nil, err
 	}
-
-	rows, err := db.QueryContext(ctx, `
-		SELECT local_report_id, hub_report_id, local_user_id, username, display_name, reason, severity, status, last_error, created_at, submitted_at, updated_at
-		FROM abuse_broadcast_outgoing_reports
-		ORDER BY created_at DESC
-		LIMIT ?`, limit)
+	rows, err := stmt.QueryContext(ctx, limit)
 	if err != nil {
 		return nil, err
 	}
 	defer rows.Close()
 
-	items := make([]AbuseBroadcastOutgoingReport, 0)
+	items := make([]AbuseBroadcastOutgoingReport, 0, limit)
 	for rows.Next() {
 		var item AbuseBroadcastOutgoingReport
 		if err := rows.Scan(&item.LocalReportID, &item.HubReportID, &item.LocalUserID, &item.Username, &item.DisplayName, &item.Reason, &item.Severity, &item.Status, &item.LastError, &item.CreatedAt, &item.SubmittedAt, &item.UpdatedAt); err != nil {
@@ -691,26 +680,18 @@ func (s *AbuseBroadcastService) ListOutgoingReports(ctx context.Context, limit i
 }
 
 func (s *AbuseBroadcastService) UnreadCount(ctx context.Context) (AbuseBroadcastUnreadCount, error) {
-	db, err := s.openStore()
+	db, err := s.readStore(ctx)
 	if err != nil {
 		return AbuseBroadcastUnreadCount{}, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return AbuseBroadcastUnreadCount{}, err
-	}
 	return AbuseBroadcastUnreadCount{Unread: countUnreadAbuseReports(ctx, db)}, nil
 }
 
 func (s *AbuseBroadcastService) MarkReportRead(ctx context.Context, reportID string) error {
-	db, err := s.openStore()
+	db, err := s.store(ctx)
 	if err != nil {
 		return err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return err
-	}
 	_, err = db.ExecContext(ctx, `
 		UPDATE abuse_broadcast_reports
 		SET read_at = CASE WHEN read_at = 0 THEN ? ELSE read_at END
@@ -723,14 +704,10 @@ func (s *AbuseBroadcastService) MatchReport(ctx context.Context, reportID string
 	if reportID == "" {
 		return AbuseBroadcastMatchResult{}, fmt.Errorf("report id is required")
 	}
-	db, err := s.openStore()
+	db, err := s.store(ctx)
 	if err != nil {
 		return AbuseBroadcastMatchResult{}, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return AbuseBroadcastMatchResult{}, err
-	}
 	var exists int64
 	if err := db.QueryRowContext(ctx, `SELECT COUNT(*) FROM abuse_broadcast_reports WHERE report_id = ?`, reportID).Scan(&exists); err != nil {
 		return AbuseBroadcastMatchResult{}, err
@@ -1022,6 +999,150 @@ func (s *AbuseBroadcastService) fetchEvents(ctx context.Context, settings abuseS
 	return data, nil
 }
 
+// Statements run on most store calls; prepared once per store through
+// prepareAbuseStmt.
+const (
+	abuseSyncStateSQL = `
+		SELECT cursor, last_sync_at, last_error
+		FROM abuse_broadcast_sync_state
+		WHERE hub_url = ?`
+
+	abuseReportsPageSQL = `
+		SELECT report_id, reporter_node_id, reason, severity, status, description, evidence_summary, raw, created_at, updated_at, synced_at, read_at, matched_at
+		FROM abuse_broadcast_reports
+		ORDER BY synced_at DESC, created_at DESC
+		LIMIT ?`
+
+	abuseOutgoingPageSQL = `
+		SELECT local_report_id, hub_report_id, local_user_id, username, display_name, reason, severity, status, last_error, created_at, submitted_at, updated_at
+		FROM abuse_broadcast_outgoing_reports
+		ORDER BY created_at DESC
+		LIMIT ?`
+
+	abuseIdentitiesSQL = `
+		SELECT identity_type, identity_value, identity_hash, confidence
+		FROM abuse_broadcast_identities
+		WHERE report_id = ?
+		ORDER BY id ASC`
+
+	abuseSettingsSQL = `
+		SELECT enabled, hub_url, node_id, secret, pull_interval_seconds, updated_at
+		FROM abuse_broadcast_settings
+		WHERE id = 1`
+
+	abuseStoreCountsSQL = `
+		SELECT
+			(SELECT COUNT(*) FROM abuse_broadcast_reports),
+			(SELECT COUNT(*) FROM abuse_broadcast_identities),
+			(SELECT COUNT(*) FROM abuse_broadcast_reports WHERE read_at = 0),
+			(SELECT COUNT(*) FROM abuse_broadcast_outgoing_reports)`
+
+	abuseUnreadCountSQL = `SELECT COUNT(*) FROM abuse_broadcast_reports WHERE read_at = 0`
+)
+
+// abuseStmts caches prepared statements (*sql.Stmt) by store handle and SQL
+// text. The store keeps a single connection, so a statement is compiled once
+// and reused instead of being re-prepared by the driver on every query.
+var abuseStmts sync.Map
+
+type abuseStmtKey struct {
+	db    *sql.DB
+	query string
+}
+
+func prepareAbuseStmt(ctx context.Context, db *sql.DB, query string) (*sql.Stmt, error) {
+	key := abuseStmtKey{db: db, query: query}
+	if v, ok := abuseStmts.Load(key); ok {
+		return v.(*sql.Stmt), nil
+	}
+	stmt, err := db.PrepareContext(ctx, query)
+	if err != nil {
+		return nil, err
+	}
+	if v, loaded := abuseStmts.LoadOrStore(key, stmt); loaded {
+		stmt.Close()
+		return v.(*sql.Stmt), nil
+	}
+	return stmt, nil
+}
+
+// abuseStores keeps one open store per path, so calls share the connection and
+// its page cache, and the schema is checked once per process instead of on
+// every call.
+var (
+	abuseStoresMu sync.Mutex
+	abuseStores   = map[string]*sql.DB{}
+	abuseReaders  = map[string]*sql.DB{}
+)
+
+// abuseStoreReaders is the size of the read-only pool per store. In WAL mode
+// readers work from their own snapshot, so list and status calls run alongside
+// each other and alongside a sync instead of queueing on the single writer.
+const abuseStoreReaders = 4
+
+// store returns the shared, schema-checked store for the configured data
+// directory. Callers must not close it.
+func (s *AbuseBroadcastService) store(ctx context.Context) (*sql.DB, error) {
+	path := s.storePath()
+	abuseStoresMu.Lock()
+	defer abuseStoresMu.Unlock()
+	if db, ok := abuseStores[path]; ok {
+		return db, nil
+	}
+	db, err := s.openStore()
+	if err != nil {
+		return nil, err
+	}
+	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
+		db.Close()
+		return nil, err
+	}
+	enableAbuseStoreIncrementalVacuum(ctx, db)
+	// Gather planner statistics (sqlite_stat1) for tables that lack or have
+	// outgrown them, so index choice does not rest on defaults.
+	_, _ = db.ExecContext(ctx, "PRAGMA optimize")
+	abuseStores[path] = db
+	return db, nil
+}
+
+// enableAbuseStoreIncrementalVacuum converts a store created before
+// auto_vacuum=INCREMENTAL was set in sqliteDSN. SQLite only changes the mode of
+// an existing file through a full VACUUM, so a store still reporting NONE (0)
+// is rebuilt once; until then PRAGMA incremental_vacuum would do nothing.
+func enableAbuseStoreIncrementalVacuum(ctx context.Context, db *sql.DB) {
+	var mode int
+	if err := db.QueryRowContext(ctx, "PRAGMA auto_vacuum").Scan(&mode); err != nil || mode != 0 {
+		return
+	}
+	if _, err := db.ExecContext(ctx, "PRAGMA auto_vacuum = INCREMENTAL"); err != nil {
+		return
+	}
+	_, _ = db.ExecContext(ctx, "VACUUM")
+}
+
+// readStore returns the shared read-only pool for the store, for calls that
+// issue no writes. Callers must not close it.
+func (s *AbuseBroadcastService) readStore(ctx context.Context) (*sql.DB, error) {
+	// The writer creates the file and schema the readers rely on.
+	if _, err := s.store(ctx); err != nil {
+		return nil, err
+	}
+	path := s.storePath()
+	abuseStoresMu.Lock()
+	defer abuseStoresMu.Unlock()
+	if db, ok := abuseReaders[path]; ok {
+		return db, nil
+	}
+	db, err := sql.Open("sqlite", sqliteDSN(path, "query_only(1)"))
+	if err != nil {
+		return nil, err
+	}
+	db.SetMaxOpenConns(abuseStoreReaders)
+	db.SetMaxIdleConns(abuseStoreReaders)
+	abuseReaders[path] = db
+	return db, nil
+}
+
 func (s *AbuseBroadcastService) openStore() (*sql.DB, error) {
 	path := s.storePath()
 	if path != ":memory:" {
@@ -1047,14 +1168,10 @@ func (s *AbuseBroadcastService) storePath() string {
 }
 
 func (s *AbuseBroadcastService) loadSettingsAdHoc(ctx context.Context) (abuseSettings, error) {
-	db, err := s.openStore()
+	db, err := s.store(ctx)
 	if err != nil {
 		return abuseSettings{}, err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return abuseSettings{}, err
-	}
 	return loadAbuseSettings(ctx, db)
 }
 
@@ -1068,14 +1185,10 @@ func hubEndpointFor(hubURL, path string) string {
 }
 
 func (s *AbuseBroadcastService) recordSyncError(ctx context.Context, hubURL, message string) error {
-	db, err := s.openStore()
+	db, err := s.store(ctx)
 	if err != nil {
 		return err
 	}
-	defer db.Close()
-	if err := ensureAbuseBroadcastTables(ctx, db); err != nil {
-		return err
-	}
 	_, err = db.ExecContext(ctx, `
 		INSERT INTO abuse_broadcast_sync_state (hub_url, cursor, last_sync_at, last_error, updated_at)
 		VALUES (?, 0, 0, ?, ?)
@@ -1134,10 +1247,16 @@ func ensureAbuseBroadcastTables(ctx context.Context, db *sql.DB) error {
 			submitted_at INTEGER NOT NULL DEFAULT 0,
 			updated_at INTEGER NOT NULL DEFAULT 0
 		)`,
-		`CREATE INDEX IF NOT EXISTS idx_abuse_broadcast_reports_synced_at ON abuse_broadcast_reports (synced_at DESC)`,
+		// Matches ListReports' ORDER BY so the page is read in index order
+		// without a sort; it supersedes the older synced_at-only index.
+		`CREATE INDEX IF NOT EXISTS idx_abuse_broadcast_reports_synced_created ON abuse_broadcast_reports (synced_at DESC, created_at DESC)`,
+		`DROP INDEX IF EXISTS idx_abuse_broadcast_reports_synced_at`,
 		`CREATE INDEX IF NOT EXISTS idx_abuse_broadcast_reports_read_at ON abuse_broadcast_reports (read_at)`,
 		`CREATE INDEX IF NOT EXISTS idx_abuse_broadcast_identity_hash ON abuse_broadcast_identities (identity_type, identity_hash)`,
-		`CREATE INDEX IF NOT EXISTS idx_abuse_broadcast_identity_report ON abuse_broadcast_identities (report_id)`,
+		// Covers the identity lookups by report, which then read only the index
+		// and get rows back in id order; it supersedes the report_id-only index.
+		`CREATE INDEX IF NOT EXISTS idx_abuse_broadcast_identity_report_covering ON abuse_broadcast_identities (report_id, id, identity_type, identity_value, identity_hash, confidence)`,
+		`DROP INDEX IF EXISTS idx_abuse_broadcast_identity_report`,
 		`CREATE INDEX IF NOT EXISTS idx_abuse_broadcast_outgoing_created ON abuse_broadcast_outgoing_reports (created_at DESC)`,
 		`CREATE TABLE IF NOT EXISTS abuse_broadcast_settings (
 			id INTEGER PRIMARY KEY CHECK (id = 1),
@@ -1199,10 +1318,11 @@ func ensureSQLiteColumn(ctx context.Context, db *sql.DB, tableName, columnName,
 func getAbuseSyncState(ctx context.Context, db *sql.DB, hubURL string) (abuseSyncState, error) {
 	var state abuseSyncState
 	var lastError string
-	err := db.QueryRowContext(ctx, `
-		SELECT cursor, last_sync_at, last_error
-		FROM abuse_broadcast_sync_state
-		WHERE hub_url = ?`, hubURL).Scan(&state.Cursor, &state.LastSyncAt, &lastError)
+	stmt, err := prepareAbuseStmt(ctx, db, abuseSyncStateSQL)
+	if err != nil {
+		return state, err
+	}
+	err = stmt.QueryRowContext(ctx, hubURL).Scan(&state.Cursor, &state.LastSyncAt, &lastError)
 	if err == sql.ErrNoRows {
 		return state, nil
 	}
@@ -1257,11 +1377,47 @@ func upsertAbuseSyncState(ctx context.Context, tx *sql.Tx, hubURL string, cursor
 }
 
 func upsertAbuseReport(ctx context.Context, tx *sql.Tx, report AbuseBroadcastReport) error {
-	_, err := tx.ExecContext(ctx, `
+	return upsertAbuseReports(ctx, tx, []AbuseBroadcastReport{report})
+}
+
+// abuseReportUpsertBatch bounds the rows per multi-row upsert, keeping the
+// bound variables (13 per row) well inside SQLite's limit.
+const abuseReportUpsertBatch = 500
+
+// upsertAbuseReports writes reports with one multi-row upsert per batch instead
+// of a statement per report. A report repeated within a batch resolves to its
+// last occurrence, as it would with sequential upserts.
+func upsertAbuseReports(ctx context.Context, tx *sql.Tx, reports []AbuseBroadcastReport) error {
+	for start := 0; start < len(reports); start += abuseReportUpsertBatch {
+		end := start + abuseReportUpsertBatch
+		if end > len(reports) {
+			end = len(reports)
+		}
+		batch := reports[start:end]
+		args := make([]interface{}, 0, len(batch)*13)
+		for _, report := range batch {
+			args = append(args,
+				report.ReportID,
+				report.ReporterNodeID,
+				report.Reason,
+				report.Severity,
+				report.Status,
+				report.Description,
+				report.EvidenceSummary,
+				report.Raw,
+				report.CreatedAt,
+				report.UpdatedAt,
+				report.SyncedAt,
+				report.ReadAt,
+				report.MatchedAt,
+			)
+		}
+		values := strings.Repeat("(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?), ", len(batch)-1) + "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+		if _, err := tx.ExecContext(ctx, `
 		INSERT INTO abuse_broadcast_reports (
 			report_id, reporter_node_id, reason, severity, status, description, evidence_summary, raw, created_at, updated_at, synced_at, read_at, matched_at
 		)
-		VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+		VALUES `+values+`
 		ON CONFLICT(report_id) DO UPDATE SET
 			reporter_node_id = excluded.reporter_node_id,
 			reason = excluded.reason,
@@ -1272,29 +1428,26 @@ func upsertAbuseReport(ctx context.Context, tx *sql.Tx, report AbuseBroadcastRep
 			raw = excluded.raw,
 			created_at = excluded.created_at,
 			updated_at = excluded.updated_at,
-			synced_at = excluded.synced_at`,
-		report.ReportID,
-		report.ReporterNodeID,
-		report.Reason,
-		report.Severity,
-		report.Status,
-		report.Description,
-		report.EvidenceSummary,
-		report.Raw,
-		report.CreatedAt,
-		report.UpdatedAt,
-		report.SyncedAt,
-		report.ReadAt,
-		report.MatchedAt,
-	)
-	return err
+			synced_at = excluded.synced_at`, args...); err != nil {
+			return err
+		}
+	}
+	return nil
 }
 
+// abuseIdentityInsertBatch bounds the rows per multi-row identity insert to
+// the bound-variable budget of abuseReportUpsertBatch, at 6 variables per row.
+const abuseIdentityInsertBatch = abuseReportUpsertBatch * 13 / 6
+
 func replaceAbuseIdentities(ctx context.Context, tx *sql.Tx, reportID string, identities []AbuseBroadcastIdentity) error {
 	if _, err := tx.ExecContext(ctx, `DELETE FROM abuse_broadcast_identities WHERE report_id = ?`, reportID); err != nil {
 		return err
 	}
+	// Multi-row INSERTs of up to abuseIdentityInsertBatch rows instead of a
+	// statement per identity; the caller's transaction already makes the whole
+	// sync one commit.
 	now := time.Now().Unix()
+	args := make([]interface{}, 0, len(identities)*6)
 	for _, identity := range identities {
 		identity.Type = strings.TrimSpace(identity.Type)
 		identity.Value = strings.TrimSpace(identity.Value)
@@ -1308,10 +1461,18 @@ func replaceAbuseIdentities(ctx context.Context, tx *sql.Tx, reportID string, id
 		if identity.Confidence == 0 {
 			identity.Confidence = 50
 		}
+		args = append(args, reportID, identity.Type, identity.Value, identity.Hash, identity.Confidence, now)
+	}
+	for start := 0; start < len(args); start += abuseIdentityInsertBatch * 6 {
+		end := start + abuseIdentityInsertBatch*6
+		if end > len(args) {
+			end = len(args)
+		}
+		batch := args[start:end]
+		values := strings.Repeat("(?, ?, ?, ?, ?, ?), ", len(batch)/6-1) + "(?, ?, ?, ?, ?, ?)"
 		if _, err := tx.ExecContext(ctx, `
-			INSERT INTO abuse_broadcast_identities (report_id, identity_type, identity_value, identity_hash, confidence, created_at)
-			VALUES (?, ?, ?, ?, ?, ?)`,
-			reportID, identity.Type, identity.Value, identity.Hash, identity.Confidence, now); err != nil {
+		INSERT INTO abuse_broadcast_identities (report_id, identity_type, identity_value, identity_hash, confidence, created_at)
+		VALUES `+values, batch...); err != nil {
 			return err
 		}
 	}
@@ -1319,11 +1480,11 @@ func replaceAbuseIdentities(ctx context.Context, tx *sql.Tx, reportID string, id
 }
 
 func listAbuseIdentities(ctx context.Context, db *sql.DB, reportID string) ([]AbuseBroadcastIdentity, error) {
-	rows, err := db.QueryContext(ctx, `
-		SELECT identity_type, identity_value, identity_hash, confidence
-		FROM abuse_broadcast_identities
-		WHERE report_id = ?
-		ORDER BY id ASC`, reportID)
+	stmt, err := prepareAbuseStmt(ctx, db, abuseIdentitiesSQL)
+	if err != nil {
+		return nil, err
+	}
+	rows, err := stmt.QueryContext(ctx, reportID)
 	if err != nil {
 		return nil, err
 	}
@@ -1340,6 +1501,38 @@ func listAbuseIdentities(ctx context.Context, db *sql.DB, reportID string) ([]Ab
 	return identities, rows.Err()
 }
 
+// listAbuseIdentitiesByReport loads the identities of every given report in one
+// query, keyed by report ID, instead of one query per report.
+func listAbuseIdentitiesByReport(ctx context.Context, db *sql.DB, reportIDs []string) (map[string][]AbuseBroadcastIdentity, error) {
+	result := make(map[string][]AbuseBroadcastIdentity, len(reportIDs))
+	if len(reportIDs) == 0 {
+		return result, nil
+	}
+	args := make([]interface{}, len(reportIDs))
+	for i, id := range reportIDs {
+		args[i] = id
+	}
+	rows, err := db.QueryContext(ctx, `
+		SELECT report_id, identity_type, identity_value, identity_hash, confidence
+		FROM abuse_broadcast_identities
+		WHERE report_id IN (`+placeholders(len(reportIDs))+`)
+		ORDER BY report_id, id ASC`, args...)
+	if err != nil {
+		return nil, err
+	}
+	defer rows.Close()
+
+	for rows.Next() {
+		var reportID string
+		var identity AbuseBroadcastIdentity
+		if err := rows.Scan(&reportID, &identity.Type, &identity.Value, &identity.Hash, &identity.Confidence); err != nil {
+			return nil, err
+		}
+		result[reportID] = append(result[reportID], identity)
+	}
+	return result, rows.Err()
+}
+
 func reportFromEvent(event hubEvent) (AbuseBroadcastReport, []AbuseBroadcastIdentity, error) {
 	report := AbuseBroadcastReport{
 		ReportID:  event.ReportID,
@@ -1594,25 +1787,49 @@ func hubErrorMessage(raw json.RawMessage) string {
 	return string(raw)
 }
 
-func sqliteDSN(path string) string {
+// sqliteDSN applies the store's connection PRAGMAs. WAL with
+// synchronous=NORMAL makes each commit a log append instead of two fsyncs and
+// keeps readers from blocking the writer; temp storage stays in memory, and a
+// 64 MB page cache plus a 256 MB mmap window serve repeat reads without
+// read syscalls. auto_vacuum=INCREMENTAL only takes effect on a new file (older
+// stores are converted by enableAbuseStoreIncrementalVacuum), and must come
+// before journal_mode, which writes the header; it lets syncs hand
+// freed pages back with PRAGMA incremental_vacuum instead of a full VACUUM.
+// extraPragmas (e.g. "query_only(1)") are appended after them. A path that is
+// already a DSN or ":memory:" is returned unchanged.
+func sqliteDSN(path string, extraPragmas ...string) string {
 	if path == ":memory:" || strings.Contains(path, "?") {
 		return path
 	}
-	return path + "?_pragma=busy_timeout(5000)&_pragma=journal_mode(WAL)"
+	dsn := path + "?_pragma=busy_timeout(30000)&_pragma=auto_vacuum(INCREMENTAL)&_pragma=journal_mode(WAL)" +
+		"&_pragma=synchronous(NORMAL)&_pragma=temp_store(MEMORY)" +
+		"&_pragma=cache_size(-64000)&_pragma=mmap_size(268435456)"
+	for _, p := range extraPragmas {
+		dsn += "&_pragma=" + p
+	}
+	return dsn
 }
 
-func countAbuseRows(ctx context.Context, db *sql.DB, table string) int64 {
-	var count int64
-	query := fmt.Sprintf("SELECT COUNT(*) FROM %s", table)
-	if err := db.QueryRowContext(ctx, query).Scan(&count); err != nil {
-		return 0
+// countAbuseStoreRows returns the report, identity, unread report and outgoing
+// report counts in one statement rather than one round trip each.
+func countAbuseStoreRows(ctx context.Context, db *sql.DB) (reports, identities, unread, outgoing int64) {
+	stmt, err := prepareAbuseStmt(ctx, db, abuseStoreCountsSQL)
+	if err == nil {
+		err = stmt.QueryRowContext(ctx).Scan(&reports, &identities, &unread, &outgoing)
 	}
-	return count
+	if err != nil {
+		return 0, 0, 0, 0
+	}
+	return reports, identities, unread, outgoing
 }
 
 func countUnreadAbuseReports(ctx context.Context, db *sql.DB) int64 {
 	var count int64
-	if err := db.QueryRowContext(ctx, `SELECT COUNT(*) FROM abuse_broadcast_reports WHERE read_at = 0`).Scan(&count); err != nil {
+	stmt, err := prepareAbuseStmt(ctx, db, abuseUnreadCountSQL)
+	if err != nil {
+		return 0
+	}
+	if err := stmt.QueryRowContext(ctx).Scan(&count); err != nil {
 		return 0
 	}
 	return count
@@ -1629,10 +1846,11 @@ func loadAbuseSettings(ctx context.Context, db *sql.DB) (abuseSettings, error) {
 		settings abuseSettings
 		enabled  int
 	)
-	err := db.QueryRowContext(ctx, `
-		SELECT enabled, hub_url, node_id, secret, pull_interval_seconds, updated_at
-		FROM abuse_broadcast_settings
-		WHERE id = 1`).Scan(
+	stmt, err := prepareAbuseStmt(ctx, db, abuseSettingsSQL)
+	if err != nil {
+		return abuseSettings{}, err
+	}
+	err = stmt.QueryRowContext(ctx).Scan(
 		&enabled,
 		&settings.HubURL,
 		&settings.NodeID,
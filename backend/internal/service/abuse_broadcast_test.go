@@ -5,6 +5,7 @@ import (
 	"encoding/json"
 	"net/http"
 	"net/http/httptest"
+	"strings"
 	"testing"
 	"time"
 
@@ -237,6 +238,17 @@ func TestAbuseBroadcastMatchReportFindsLinuxDoAndIP(t *testing.T) {
 	}
 }
 
+func TestSQLiteDSNExtraPragmasRespectPassthrough(t *testing.T) {
+	for _, path := range []string{":memory:", "file:abuse.db?mode=ro"} {
+		if got := sqliteDSN(path, "query_only(1)"); got != path {
+			t.Fatalf("sqliteDSN(%q) = %q, want it unchanged", path, got)
+		}
+	}
+	if got := sqliteDSN("abuse.db", "query_only(1)"); !strings.HasPrefix(got, "abuse.db?_pragma=") || !strings.HasSuffix(got, "&_pragma=query_only(1)") {
+		t.Fatalf("unexpected reader DSN: %q", got)
+	}
+}
+
 func containsString(items []string, value string) bool {
 	for _, item := range items {
 		if item == value {
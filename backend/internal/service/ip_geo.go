@@ -1,16 +1,23 @@
 package service
 
 import (
+	"bytes"
+	"context"
 	"fmt"
 	"io"
 	"net"
 	"net/http"
 	"os"
 	"path/filepath"
+	"sort"
+	"strconv"
 	"sync"
+	"sync/atomic"
 	"time"
+	"unique"
 
 	"github.com/oschwald/geoip2-golang"
+	"github.com/oschwald/maxminddb-golang"
 )
 
 // IPGeoInfo represents IP geolocation information
@@ -43,13 +50,101 @@ const geoipMinFileSize = 1024 * 1024
 // GeoLite2-City is ~66MB; 120MB leaves headroom for future growth without unbounded writes.
 const geoipMaxFileSize int64 = 120 * 1024 * 1024
 
+// geoipDownloadBufferSize is the chunk size used to stream downloads to disk.
+const geoipDownloadBufferSize = 64 * 1024
+
+// geoCacheMaxEntries bounds the in-process lookup cache; the cache is dropped
+// wholesale when full and whenever the database is reloaded.
+const geoCacheMaxEntries = 100000
+
+// geoRecord declares only the fields this service reads, so each lookup is a
+// single trie walk that decodes country/subdivision/city names and nothing else
+// (location, postal, traits, ... are skipped by the decoder). The ASN fields are
+// filled in the same pass when a combined City+ASN database is deployed.
+type geoRecord struct {
+	Country struct {
+		IsoCode string   `maxminddb:"iso_code"`
+		Names   geoNames `maxminddb:"names"`
+	} `maxminddb:"country"`
+	Subdivisions []struct {
+		Names geoNames `maxminddb:"names"`
+	} `maxminddb:"subdivisions"`
+	City struct {
+		Names geoNames `maxminddb:"names"`
+	} `maxminddb:"city"`
+	AutonomousSystemNumber       uint   `maxminddb:"autonomous_system_number"`
+	AutonomousSystemOrganization string `maxminddb:"autonomous_system_organization"`
+}
+
+// geoNames decodes only the two locales we display. Decoding into fixed fields
+// instead of map[string]string skips the other translations without allocating
+// a map per record.
+type geoNames struct {
+	ZhCN string `maxminddb:"zh-CN"`
+	En   string `maxminddb:"en"`
+}
+
+// preferred returns the Chinese name, falling back to English.
+func (n geoNames) preferred() string {
+	if n.ZhCN != "" {
+		return n.ZhCN
+	}
+	return n.En
+}
+
+// geoDatabase is an opened mmdb plus the hook that releases its backing memory.
+// See openGeoDatabase for the platform-specific open paths.
+//
+// It is reference counted so a reload can swap in a new database without
+// blocking lookups: the service owns one reference, every lookup holds one while
+// it walks the trie, and the file is closed when the last reference is dropped.
+type geoDatabase struct {
+	reader  *maxminddb.Reader
+	release func() error
+	refs    atomic.Int64
+}
+
+// newGeoDatabase wraps an opened reader, holding the owner's reference.
+func newGeoDatabase(reader *maxminddb.Reader, release func() error) *geoDatabase {
+	d := &geoDatabase{reader: reader, release: release}
+	d.refs.Store(1)
+	return d
+}
+
+// acquire takes a reference, failing if the database has already been closed.
+func (d *geoDatabase) acquire() bool {
+	for {
+		n := d.refs.Load()
+		if n <= 0 {
+			return false
+		}
+		if d.refs.CompareAndSwap(n, n+1) {
+			return true
+		}
+	}
+}
+
+// done drops a reference and closes the database after the last one.
+func (d *geoDatabase) done() {
+	if d.refs.Add(-1) == 0 {
+		d.reader.Close()
+		if d.release != nil {
+			d.release()
+		}
+	}
+}
+
 // IPGeoService provides IP geolocation queries using MaxMind GeoLite2
 type IPGeoService struct {
-	cityReader *geoip2.Reader
-	dbPath     string
-	mu         sync.RWMutex
-	available  bool
-	stopCh     chan struct{}
+	city   atomic.Pointer[geoDatabase]
+	dbPath string
+	stopCh chan struct{}
+
+	// cache holds final lookup answers (including "not in database") keyed by IP.
+	// Lookups are deterministic for a given database file, so entries stay valid
+	// until the next reload.
+	cacheMu sync.RWMutex
+	cache   map[string]IPGeoInfo
 }
 
 var (
@@ -100,14 +195,13 @@ func (s *IPGeoService) init() {
 			continue
 		}
 		if _, err := os.Stat(path); err == nil {
-			reader, err := geoip2.Open(path)
+			reader, err := openGeoDatabase(path)
 			if err != nil {
 				fmt.Printf("[GeoIP] Failed to open %s: %v\n", path, err)
 				continue
 			}
-			s.cityReader = reader
+			s.city.Store(reader)
 			s.dbPath = path
-			s.available = true
 			fmt.Printf("[GeoIP] Loaded database: %s\n", path)
 			// Start background updater
 			go s.backgroundUpdater()
@@ -128,21 +222,88 @@ func (s *IPGeoService) init() {
 	}
 
 	// Load the downloaded database
-	reader, err := geoip2.Open(downloadPath)
+	reader, err := openGeoDatabase(downloadPath)
 	if err != nil {
 		fmt.Printf("[GeoIP] Failed to open downloaded database: %v\n", err)
 		return
 	}
-	s.cityReader = reader
+	s.city.Store(reader)
 	s.dbPath = downloadPath
-	s.available = true
 	fmt.Printf("[GeoIP] Database downloaded and loaded: %s\n", downloadPath)
 
 	// Start background updater
 	go s.backgroundUpdater()
 }
 
-// downloadDatabase downloads the GeoLite2-City.mmdb file from mirror URLs
+// mirrorAttempt is the outcome of one concurrent mirror request.
+type mirrorAttempt struct {
+	url  string
+	resp *http.Response
+	err  error
+}
+
+// raceMirrors requests all candidate mirrors concurrently and returns the first
+// response that is 200 with a plausible Content-Length. The slower requests are
+// canceled. The returned cancel func must be called once the body is consumed.
+func raceMirrors(client *http.Client, urls []string) (*http.Response, string, context.CancelFunc, error) {
+	attempts := make(chan mirrorAttempt, len(urls))
+	cancels := make(map[string]context.CancelFunc, len(urls))
+	for _, url := range urls {
+		ctx, cancel := context.WithCancel(context.Background())
+		cancels[url] = cancel
+		go func(ctx context.Context, url string) {
+			req, err := http.NewRequestWithContext(ctx, http.MethodGet, url, nil)
+			if err != nil {
+				attempts <- mirrorAttempt{url: url, err: err}
+				return
+			}
+			resp, err := client.Do(req)
+			attempts <- mirrorAttempt{url: url, resp: resp, err: err}
+		}(ctx, url)
+	}
+
+	for remaining := len(urls); remaining > 0; remaining-- {
+		a := <-attempts
+		if a.err != nil {
+			fmt.Printf("[GeoIP] Download failed from %s: %v\n", a.url, a.err)
+			cancels[a.url]()
+			continue
+		}
+		if a.resp.StatusCode != http.StatusOK {
+			a.resp.Body.Close()
+			cancels[a.url]()
+			fmt.Printf("[GeoIP] Download failed from %s: HTTP %d\n", a.url, a.resp.StatusCode)
+			continue
+		}
+		// Reject absurd Content-Length early (when present).
+		if a.resp.ContentLength > 0 && (a.resp.ContentLength < geoipMinFileSize || a.resp.ContentLength > geoipMaxFileSize) {
+			a.resp.Body.Close()
+			cancels[a.url]()
+			fmt.Printf("[GeoIP] Unexpected Content-Length %d from %s, skipping\n", a.resp.ContentLength, a.url)
+			continue
+		}
+
+		// Winner: cancel the others and release whatever they still return.
+		for url, cancel := range cancels {
+			if url != a.url {
+				cancel()
+			}
+		}
+		go func(n int) {
+			for ; n > 0; n-- {
+				if late := <-attempts; late.resp != nil {
+					late.resp.Body.Close()
+				}
+			}
+		}(remaining - 1)
+		return a.resp, a.url, cancels[a.url], nil
+	}
+
+	return nil, "", nil, fmt.Errorf("no mirror responded successfully")
+}
+
+// downloadDatabase downloads the GeoLite2-City.mmdb file, streaming from whichever
+// mirror answers first. If that transfer fails, the remaining mirrors are raced again.
 func (s *IPGeoService) downloadDatabase(destPath string) error {
 	// Ensure directory exists
 	dir := filepath.Dir(destPath)
@@ -155,40 +316,42 @@ func (s *IPGeoService) downloadDatabase(destPath string) error {
 
 	// Hard cap: connection + transfer cannot hang forever and fill the disk (#26).
 	client := &http.Client{Timeout: 180 * time.Second}
+	buf := make([]byte, geoipDownloadBufferSize)
 
-	for _, url := range geoipDownloadURLs {
-		fmt.Printf("[GeoIP] Downloading from %s ...\n", url)
-
-		resp, err := client.Get(url)
+	candidates := append([]string(nil), geoipDownloadURLs...)
+	for len(candidates) > 0 {
+		fmt.Printf("[GeoIP] Racing %d download mirrors ...\n", len(candidates))
+		resp, url, done, err := raceMirrors(client, candidates)
 		if err != nil {
-			fmt.Printf("[GeoIP] Download failed from %s: %v\n", url, err)
-			continue
-		}
-
-		if resp.StatusCode != http.StatusOK {
-			resp.Body.Close()
-			fmt.Printf("[GeoIP] Download failed from %s: HTTP %d\n", url, resp.StatusCode)
-			continue
+			break
 		}
-
-		// Reject absurd Content-Length early (when present).
-		if resp.ContentLength > 0 && (resp.ContentLength < geoipMinFileSize || resp.ContentLength > geoipMaxFileSize) {
-			resp.Body.Close()
-			fmt.Printf("[GeoIP] Unexpected Content-Length %d from %s, skipping\n", resp.ContentLength, url)
-			continue
+		for i, candidate := range candidates {
+			if candidate == url {
+				candidates = append(candidates[:i], candidates[i+1:]...)
+				break
+			}
 		}
+		fmt.Printf("[GeoIP] Downloading from %s ...\n", url)
 
 		out, err := os.Create(tempPath)
 		if err != nil {
 			resp.Body.Close()
+			done()
 			return fmt.Errorf("create temp file: %w", err)
 		}
 
+		// Stream in fixed 64KB chunks so memory stays constant regardless of file size.
 		// LimitReader stops after max+1 bytes so a runaway body cannot fill the disk.
+		// The struct wrapper hides *os.File's ReaderFrom so our buffer is actually used.
 		limited := io.LimitReader(resp.Body, geoipMaxFileSize+1)
-		written, err := io.Copy(out, limited)
+		written, err := io.CopyBuffer(struct{ io.Writer }{out}, limited, buf)
+		if err == nil {
+			// Flush before the rename so a crash cannot leave a truncated mmdb in place.
+			err = out.Sync()
+		}
 		out.Close()
 		resp.Body.Close()
+		done()
 
 		if err != nil {
 			fmt.Printf("[GeoIP] Download write failed from %s: %v\n", url, err)
@@ -217,10 +380,17 @@ func (s *IPGeoService) downloadDatabase(destPath string) error {
 		}
 		testReader.Close()
 
-		// Atomically replace the old file
+		// Atomically replace the old file. Readers that still map the previous
+		// file keep its inode alive until they are closed, so the swap is safe
+		// while lookups are in flight.
 		if err := os.Rename(tempPath, destPath); err != nil {
 			return fmt.Errorf("rename %s -> %s: %w", tempPath, destPath, err)
 		}
+		// Persist the rename itself (best-effort; not supported everywhere).
+		if d, err := os.Open(dir); err == nil {
+			d.Sync()
+			d.Close()
+		}
 
 		sizeMB := float64(written) / (1024 * 1024)
 		fmt.Printf("[GeoIP] Download complete: %.1f MB\n", sizeMB)
@@ -277,96 +447,262 @@ func (s *IPGeoService) tryUpdateDatabase() {
 	}
 
 	// Reload the database
-	newReader, err := geoip2.Open(s.dbPath)
+	newReader, err := openGeoDatabase(s.dbPath)
 	if err != nil {
 		fmt.Printf("[GeoIP] Failed to reload updated database: %v\n", err)
 		return
 	}
 
-	s.mu.Lock()
-	oldReader := s.cityReader
-	s.cityReader = newReader
-	s.available = true
-	s.mu.Unlock()
-
-	if oldReader != nil {
-		oldReader.Close()
+	// Double buffering: the new database is fully opened before the swap, lookups
+	// never see a gap, and the old one closes once in-flight lookups release it.
+	if old := s.city.Swap(newReader); old != nil {
+		old.done()
 	}
+	s.clearCache()
 
 	fmt.Println("[GeoIP] Database updated and reloaded successfully")
 }
 
 // IsAvailable returns whether the GeoIP service is available
 func (s *IPGeoService) IsAvailable() bool {
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	return s.available
+	return s.city.Load() != nil
+}
+
+// acquireCity returns the current database with a reference held, or nil when
+// none is loaded. Callers release it with done().
+func (s *IPGeoService) acquireCity() *geoDatabase {
+	for {
+		db := s.city.Load()
+		if db == nil || db.acquire() {
+			return db
+		}
+		// Lost a race with a reload that already closed db; load the new one.
+	}
 }
 
 // QuerySingle looks up a single IP address
 func (s *IPGeoService) QuerySingle(ip string) IPGeoInfo {
-	result := IPGeoInfo{IP: ip}
+	parsedIP, info, local := localGeoInfo(ip)
+	if local {
+		return info
+	}
+	if info, ok := s.getCached(ip); ok {
+		return info
+	}
+
+	db := s.acquireCity()
+	info, cacheable := lookupInDatabase(db, ip, parsedIP, nil)
+	if db != nil {
+		db.done()
+	}
+
+	if cacheable {
+		s.setCached(db, map[string]IPGeoInfo{ip: info})
+	}
+	return info
+}
+
+// privateIPGeoInfo is the shared template for private/loopback results; callers
+// copy it by value and only fill in the IP.
+var privateIPGeoInfo = IPGeoInfo{
+	Country:     "本地网络",
+	CountryCode: "LO",
+	Success:     true,
+}
+
+// geoMiss is an IP that has to go to the database, kept with its parsed form.
+type geoMiss struct {
+	ip     string
+	parsed net.IP
+}
+
+// QueryBatch looks up multiple IPs and returns a map of IP -> IPGeoInfo.
+// Cache reads, database lookups and cache writes each take their lock once per
+// batch rather than once per IP.
+func (s *IPGeoService) QueryBatch(ips []string) map[string]IPGeoInfo {
+	results := make(map[string]IPGeoInfo, len(ips))
+	candidates := make([]geoMiss, 0, len(ips))
+	for _, ip := range ips {
+		parsedIP, info, local := localGeoInfo(ip)
+		if local {
+			results[ip] = info
+		} else {
+			candidates = append(candidates, geoMiss{ip: ip, parsed: parsedIP})
+		}
+	}
+	if len(candidates) == 0 {
+		return results
+	}
+
+	misses := candidates[:0]
+	s.cacheMu.RLock()
+	for _, c := range candidates {
+		if info, ok := s.cache[c.ip]; ok {
+			results[c.ip] = info
+		} else {
+			misses = append(misses, c)
+		}
+	}
+	s.cacheMu.RUnlock()
+
+	if len(misses) == 0 {
+		return results
+	}
+
+	// Walk the trie in address order: neighbouring IPs share upper trie nodes, so
+	// those stay in CPU cache instead of being re-fetched for every lookup.
+	// net.ParseIP yields the 16-byte form, so byte order is numeric order.
+	sort.Slice(misses, func(i, j int) bool {
+		return bytes.Compare(misses[i].parsed, misses[j].parsed) < 0
+	})
+
+	pending := make(map[string]IPGeoInfo, len(misses))
+	records := make(map[uintptr]IPGeoInfo)
+	db := s.acquireCity()
+	for _, m := range misses {
+		if _, done := results[m.ip]; done {
+			continue
+		}
+		info, cacheable := lookupInDatabase(db, m.ip, m.parsed, records)
+		results[m.ip] = info
+		if cacheable {
+			pending[m.ip] = info
+		}
+	}
+	if db != nil {
+		db.done()
+	}
 
-	parsedIP := net.ParseIP(ip)
+	s.setCached(db, pending)
+	return results
+}
+
+// localGeoInfo answers the IPs that never need the database: unparseable input
+// and private/loopback addresses. Those results are constant, so callers return
+// them directly without touching the cache or the reader lock. For every other
+// IP it returns the parsed address and local=false.
+func localGeoInfo(ip string) (parsedIP net.IP, info IPGeoInfo, local bool) {
+	parsedIP = net.ParseIP(ip)
 	if parsedIP == nil {
-		return result
+		return nil, IPGeoInfo{IP: ip}, true
 	}
 
 	// Skip private IPs
 	if parsedIP.IsPrivate() || parsedIP.IsLoopback() {
-		result.Country = "本地网络"
-		result.CountryCode = "LO"
-		result.Success = true
-		return result
+		info = privateIPGeoInfo
+		info.IP = ip
+		return parsedIP, info, true
 	}
 
-	s.mu.RLock()
-	defer s.mu.RUnlock()
-	if !s.available || s.cityReader == nil {
-		return result
+	return parsedIP, IPGeoInfo{IP: ip}, false
+}
+
+// lookupInDatabase resolves one public IP against db, which the caller holds a
+// reference to (nil when no database is loaded).
+//
+// cacheable reports whether the answer is final for this database file: found
+// records and addresses the database has no record for (bogons, unallocated or
+// freshly allocated ranges) are both cached, so repeat batches do not re-walk
+// the trie for them; the cache is dropped on reload anyway. A missing database
+// or a decode error is never cached so the next query retries.
+//
+// The mmdb stores each distinct record once and many networks point at it, so
+// a batch passes records to decode each record offset only once; every other
+// IP in the same city reuses the extracted fields.
+func lookupInDatabase(db *geoDatabase, ip string, parsedIP net.IP, records map[uintptr]IPGeoInfo) (result IPGeoInfo, cacheable bool) {
+	result = IPGeoInfo{IP: ip}
+
+	if db == nil {
+		return result, false
 	}
 
-	record, err := s.cityReader.City(parsedIP)
+	offset, err := db.reader.LookupOffset(parsedIP)
 	if err != nil {
-		return result
+		return result, false
+	}
+	if offset == maxminddb.NotFound {
+		return result, true
+	}
+	if known, ok := records[offset]; ok {
+		known.IP = ip
+		return known, true
+	}
+
+	var record geoRecord
+	if err := db.reader.Decode(offset, &record); err != nil {
+		return result, false
 	}
 
 	result.Success = true
 
-	// Country
-	if name, ok := record.Country.Names["zh-CN"]; ok {
-		result.Country = name
-	} else if name, ok := record.Country.Names["en"]; ok {
-		result.Country = name
-	}
+	result.Country = record.Country.Names.preferred()
 	result.CountryCode = record.Country.IsoCode
-
-	// Region/Province
 	if len(record.Subdivisions) > 0 {
-		if name, ok := record.Subdivisions[0].Names["zh-CN"]; ok {
-			result.Region = name
-		} else if name, ok := record.Subdivisions[0].Names["en"]; ok {
-			result.Region = name
-		}
+		result.Region = record.Subdivisions[0].Names.preferred()
 	}
+	result.City = record.City.Names.preferred()
 
-	// City
-	if name, ok := record.City.Names["zh-CN"]; ok {
-		result.City = name
-	} else if name, ok := record.City.Names["en"]; ok {
-		result.City = name
+	// ASN (combined databases only)
+	if record.AutonomousSystemNumber > 0 {
+		result.ASN = "AS" + strconv.FormatUint(uint64(record.AutonomousSystemNumber), 10)
+		result.ISP = record.AutonomousSystemOrganization
+		result.Org = record.AutonomousSystemOrganization
 	}
 
-	return result
+	if records != nil {
+		records[offset] = result
+	}
+	return result, true
 }
 
-// QueryBatch looks up multiple IPs and returns a map of IP -> IPGeoInfo
-func (s *IPGeoService) QueryBatch(ips []string) map[string]IPGeoInfo {
-	results := make(map[string]IPGeoInfo, len(ips))
-	for _, ip := range ips {
-		results[ip] = s.QuerySingle(ip)
+// getCached returns a cached lookup result.
+func (s *IPGeoService) getCached(ip string) (IPGeoInfo, bool) {
+	s.cacheMu.RLock()
+	defer s.cacheMu.RUnlock()
+	info, ok := s.cache[ip]
+	return info, ok
+}
+
+// setCached stores a set of lookup results under a single lock acquisition.
+// db is the database they were read from: if a reload has swapped it out in
+// the meantime the results are dropped, since the reload's clearCache may
+// already have run and would not remove them.
+func (s *IPGeoService) setCached(db *geoDatabase, entries map[string]IPGeoInfo) {
+	if len(entries) == 0 {
+		return
+	}
+	s.cacheMu.Lock()
+	defer s.cacheMu.Unlock()
+	if s.city.Load() != db {
+		return
+	}
+	if s.cache == nil || len(s.cache)+len(entries) > geoCacheMaxEntries {
+		s.cache = make(map[string]IPGeoInfo, len(entries))
+	}
+	for ip, info := range entries {
+		s.cache[ip] = internGeoInfo(info)
 	}
-	return results
+}
+
+// internGeoInfo canonicalises the location strings of a cached entry. Decoding
+// allocates fresh strings per lookup, while a cache of many IPs holds only a few
+// thousand distinct countries/regions/cities; interning lets entries share them.
+func internGeoInfo(info IPGeoInfo) IPGeoInfo {
+	info.Country = unique.Make(info.Country).Value()
+	info.CountryCode = unique.Make(info.CountryCode).Value()
+	info.Region = unique.Make(info.Region).Value()
+	info.City = unique.Make(info.City).Value()
+	info.ISP = unique.Make(info.ISP).Value()
+	info.Org = unique.Make(info.Org).Value()
+	info.ASN = unique.Make(info.ASN).Value()
+	return info
+}
+
+// clearCache drops all cached lookups, e.g. after the database was replaced.
+func (s *IPGeoService) clearCache() {
+	s.cacheMu.Lock()
+	s.cache = nil
+	s.cacheMu.Unlock()
 }
 
 // LookupIPGeo looks up one IP through the configured GeoIP service provider.
@@ -391,6 +727,18 @@ func LookupIPGeoBatch(ips []string) map[string]IPGeoInfo {
 	return svc.QueryBatch(ips)
 }
 
+// LookupIPGeoList looks up multiple IPs and returns the results in input order.
+// IPGeoInfo already carries the snake_case JSON tags of FormatIPGeoInfo, so
+// handlers can serialize the slice directly instead of building a map per IP.
+func LookupIPGeoList(ips []string) []IPGeoInfo {
+	geoMap := LookupIPGeoBatch(ips)
+	results := make([]IPGeoInfo, len(ips))
+	for i, ip := range ips {
+		results[i] = geoMap[ip]
+	}
+	return results
+}
+
 // IsIPGeoAvailable reports whether the configured GeoIP service is ready.
 func IsIPGeoAvailable() bool {
 	svc := ipGeoServiceProvider()
@@ -433,11 +781,8 @@ func (s *IPGeoService) Close() {
 		}
 	}
 
-	s.mu.Lock()
-	defer s.mu.Unlock()
-	if s.cityReader != nil {
-		s.cityReader.Close()
-		s.cityReader = nil
-		s.available = false
+	if old := s.city.Swap(nil); old != nil {
+		old.done()
 	}
+	s.clearCache()
 }
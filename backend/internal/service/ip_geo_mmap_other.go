@@ -0,0 +1,15 @@
+//go:build !linux
+
+package service
+
+import "github.com/oschwald/maxminddb-golang"
+
+// openGeoDatabase opens the mmdb with the library's own mapping; the madvise
+// hints used on Linux are not applied on other platforms.
+func openGeoDatabase(path string) (*geoDatabase, error) {
+	reader, err := maxminddb.Open(path)
+	if err != nil {
+		return nil, err
+	}
+	return newGeoDatabase(reader, nil), nil
+}
@@ -0,0 +1,54 @@
+package service
+
+import (
+	"testing"
+
+	"github.com/oschwald/maxminddb-golang"
+)
+
+func TestQueryBatchAnswersPrivateIPsWithoutCaching(t *testing.T) {
+	s := &IPGeoService{}
+
+	results := s.QueryBatch([]string{"10.0.0.1", "127.0.0.1", "not-an-ip"})
+
+	for _, ip := range []string{"10.0.0.1", "127.0.0.1"} {
+		info := results[ip]
+		if !info.Success || info.CountryCode != "LO" {
+			t.Fatalf("%s should resolve locally, got %+v", ip, info)
+		}
+	}
+	if info := results["not-an-ip"]; info.Success || info.IP != "not-an-ip" {
+		t.Fatalf("invalid IP should fail with its input echoed, got %+v", info)
+	}
+	if len(s.cache) != 0 {
+		t.Fatalf("local results must not be cached, cache has %d entries", len(s.cache))
+	}
+}
+
+func TestGeoDatabaseSwapWaitsForInFlightLookups(t *testing.T) {
+	released := 0
+	s := &IPGeoService{}
+	s.city.Store(newGeoDatabase(&maxminddb.Reader{}, func() error {
+		released++
+		return nil
+	}))
+
+	held := s.acquireCity()
+	if held == nil {
+		t.Fatal("expected the loaded database to be acquirable")
+	}
+
+	// Reload/Close drops the owner's reference while a lookup is still running.
+	s.city.Swap(nil).done()
+	if released != 0 {
+		t.Fatal("database must stay open while a lookup holds it")
+	}
+
+	held.done()
+	if released != 1 {
+		t.Fatalf("database should close after the last reference, released=%d", released)
+	}
+	if held.acquire() {
+		t.Fatal("a closed database must not be acquirable")
+	}
+}
@@ -1,12 +1,19 @@
 package service
 
 import (
+	"encoding/json"
 	"fmt"
+	"sort"
 	"strings"
+	"sync"
+	"sync/atomic"
 	"time"
 
 	"github.com/new-api-tools/backend/internal/cache"
 	"github.com/new-api-tools/backend/internal/database"
+	"github.com/new-api-tools/backend/internal/logger"
+	"golang.org/x/sync/errgroup"
+	"golang.org/x/sync/singleflight"
 )
 
 // WindowSeconds maps time window strings to seconds
@@ -20,6 +27,16 @@ var WindowSeconds = map[string]int64{
 	"7d":  604800,
 }
 
+// windowStartTime returns the Unix start of window counted back from now,
+// treating unknown windows as 24h.
+func windowStartTime(window string) int64 {
+	seconds, ok := WindowSeconds[window]
+	if !ok {
+		seconds = 86400
+	}
+	return time.Now().Unix() - seconds
+}
+
 // IPMonitoringService handles IP analysis queries
 type IPMonitoringService struct {
 	db    *database.Manager
@@ -33,6 +50,511 @@ const (
 	userIPDetailLimit        = 10
 )
 
+// ipMonitoringCacheTTL is how long aggregated results stay in the shared cache.
+const ipMonitoringCacheTTL = 5 * time.Minute
+
+// ipMonitoringCacheVersion is part of every IP-monitoring list cache key. Bump
+// it whenever a query or the result shape changes, so entries written by the
+// previous release are never read back and simply expire.
+const ipMonitoringCacheVersion = "v2"
+
+// ipMonitoringCacheKey builds the cache key for one list variant.
+func ipMonitoringCacheKey(kind, window string, threshold, fetchLimit int) string {
+	return fmt.Sprintf("ip:%s:%s:%s:%d:%d", ipMonitoringCacheVersion, kind, window, threshold, fetchLimit)
+}
+
+// ipMonitoringL1TTL bounds the in-process copy of decoded results. Refreshes on
+// other instances evict it through cache invalidation messages, so it can live
+// as long as the shared entry.
+const ipMonitoringL1TTL = ipMonitoringCacheTTL
+
+// ipMonitoringL1 holds results (*ipMonitoringL1Entry), split into their encoded
+// top-level fields, in front of the cache manager: a hit is a map lookup
+// instead of a JSON decode (or a Redis
+// round trip once the manager's own local entry lapses). Values are shared
+// between callers and must be treated as read-only.
+var ipMonitoringL1 sync.Map
+
+type ipMonitoringL1Entry struct {
+	value     map[string]interface{}
+	expiresAt time.Time
+}
+
+// sweepIPMonitoringL1 drops expired L1 entries. Loads only evict the key they
+// read, so without it variants nobody asks for again would stay in memory for
+// the life of the process; the warm ticker runs it on every tick.
+func sweepIPMonitoringL1(now time.Time) {
+	ipMonitoringL1.Range(func(key, value interface{}) bool {
+		if !now.Before(value.(*ipMonitoringL1Entry).expiresAt) {
+			ipMonitoringL1.Delete(key)
+		}
+		return true
+	})
+}
+
+func init() {
+	// Drop local copies when another instance recomputes an entry
+	cache.OnInvalidate(func(key string) {
+		ipMonitoringL1.Delete(key)
+	})
+}
+
+// loadIPMonitoringCache returns a cached result from the in-process L1 or the
+// shared cache, promoting shared-cache hits into L1.
+//
+// Shared-cache entries are split only at the top level: each field stays the
+// json.RawMessage it was stored as, so the item lists are neither decoded here
+// nor re-encoded by the response writer, which copies raw JSON verbatim.
+func loadIPMonitoringCache(key string) (map[string]interface{}, bool) {
+	if v, ok := ipMonitoringL1.Load(key); ok {
+		entry := v.(*ipMonitoringL1Entry)
+		if time.Now().Before(entry.expiresAt) {
+			return entry.value, true
+		}
+		ipMonitoringL1.Delete(key)
+	}
+
+	var raw map[string]json.RawMessage
+	if found, err := cache.Get().GetJSON(key, &raw); !found || err != nil {
+		return nil, false
+	}
+	cached := rawIPMonitoringResult(raw)
+	ipMonitoringL1.Store(key, &ipMonitoringL1Entry{value: cached, expiresAt: time.Now().Add(ipMonitoringL1TTL)})
+	return cached, true
+}
+
+// storeIPMonitoringCache writes a freshly computed result to both levels and
+// tells other instances to drop their now-stale local copies.
+//
+// The result is encoded once here: the shared cache stores those bytes as is,
+// and L1 keeps them split into raw top-level fields, just as a shared-cache hit
+// would, so later local hits hand the response writer raw JSON instead of
+// re-encoding the item maps on every request.
+func storeIPMonitoringCache(key string, result map[string]interface{}) {
+	data, err := json.Marshal(result)
+	if err != nil {
+		return
+	}
+	var raw map[string]json.RawMessage
+	if err := json.Unmarshal(data, &raw); err != nil {
+		return
+	}
+	ipMonitoringL1.Store(key, &ipMonitoringL1Entry{value: rawIPMonitoringResult(raw), expiresAt: time.Now().Add(ipMonitoringL1TTL)})
+	cm := cache.Get()
+	if err := cm.SetRaw(key, data, ipMonitoringCacheTTL); err == nil {
+		cm.PublishInvalidation(key)
+	}
+}
+
+func rawIPMonitoringResult(raw map[string]json.RawMessage) map[string]interface{} {
+	result := make(map[string]interface{}, len(raw))
+	for k, v := range raw {
+		result[k] = v
+	}
+	return result
+}
+
+// ipMonitoringPrefetchLimit is the row count fetched for the Top-N lists when a
+// smaller limit is requested. Every limit up to it shares one cache entry and is
+// served by truncating it, so changing the page size does not query again.
+const ipMonitoringPrefetchLimit = 200
+
+// limitIPMonitoringItems returns result with at most limit items. Results read
+// back from the shared cache hold items as raw JSON, which is split into raw
+// elements only when it actually needs truncating.
+func limitIPMonitoringItems(result map[string]interface{}, limit int) map[string]interface{} {
+	var items interface{}
+	switch v := result["items"].(type) {
+	case []map[string]interface{}:
+		if len(v) <= limit {
+			return result
+		}
+		items = v[:limit]
+	case json.RawMessage:
+		var list []json.RawMessage
+		if err := json.Unmarshal(v, &list); err != nil || len(list) <= limit {
+			return result
+		}
+		items = list[:limit]
+	default:
+		return result
+	}
+
+	limited := make(map[string]interface{}, len(result))
+	for k, v := range result {
+		limited[k] = v
+	}
+	limited["items"] = items
+	limited["total"] = limit
+	return limited
+}
+
+// ipMonitoringFlight collapses concurrent cache fills for the same key.
+var ipMonitoringFlight singleflight.Group
+
+// ipMonitoringFillLockTTL bounds how long an instance may hold the cross-instance
+// fill lock; ipMonitoringFillWait is how long other instances wait for its result
+// before computing it themselves.
+const (
+	ipMonitoringFillLockTTL = 60 * time.Second
+	ipMonitoringFillWait    = 3 * time.Second
+)
+
+// fillIPMonitoringCache computes a result after a cache miss without stampeding
+// the database when a popular entry expires: concurrent callers in this process
+// share one computation (singleflight), and across instances only the holder of
+// a short Redis lock runs the aggregation while the others poll the cache
+// briefly for its result. Successful results are written to both cache levels.
+func fillIPMonitoringCache(key string, noCache bool, load func() (map[string]interface{}, bool)) map[string]interface{} {
+	v, _, _ := ipMonitoringFlight.Do(key, func() (interface{}, error) {
+		cm := cache.Get()
+		lockKey := "ip:lock:" + key
+		locked, err := cm.SetNX(lockKey, 1, ipMonitoringFillLockTTL)
+		if err == nil && !locked && !noCache {
+			for deadline := time.Now().Add(ipMonitoringFillWait); time.Now().Before(deadline); {
+				time.Sleep(200 * time.Millisecond)
+				if cached, found := loadIPMonitoringCache(key); found {
+					return cached, nil
+				}
+			}
+		}
+		if locked {
+			defer cm.Delete(lockKey)
+		}
+
+		result, ok := load()
+		if ok {
+			storeIPMonitoringCache(key, result)
+		}
+		return result, nil
+	})
+	return v.(map[string]interface{})
+}
+
+// Fixed IP-monitoring statements. Keeping the text constant lets the database
+// layer reuse their prepared statements (QueryPreparedWithTimeout).
+const (
+	ipStatsUsersPGSQL = `
+		SELECT
+			COUNT(*) as total_users,
+			SUM(CASE
+				WHEN setting IS NOT NULL AND setting <> ''
+					 AND setting::jsonb->>'record_ip_log' = 'true' THEN 1
+				ELSE 0
+			END) as enabled_count
+		FROM users
+		WHERE deleted_at IS NULL`
+
+	ipStatsUsersMySQLSQL = `
+		SELECT
+			COUNT(*) as total_users,
+			SUM(CASE
+				WHEN setting IS NOT NULL AND setting <> ''
+					 AND JSON_EXTRACT(setting, '$.record_ip_log') = true THEN 1
+				ELSE 0
+			END) as enabled_count
+		FROM users
+		WHERE deleted_at IS NULL`
+
+	uniqueIPs24hSQL = "SELECT COUNT(DISTINCT ip) as unique_ips FROM logs WHERE created_at >= ? AND ip IS NOT NULL AND ip <> ''"
+
+	sharedIPsTopSQL = `
+		SELECT ip, COUNT(DISTINCT token_id) as token_count,
+			COUNT(DISTINCT user_id) as user_count,
+			COUNT(*) as request_count
+		FROM logs
+		WHERE created_at >= ? AND ip IS NOT NULL AND ip <> ''
+		GROUP BY ip
+		HAVING COUNT(DISTINCT token_id) >= ?
+		ORDER BY token_count DESC
+		LIMIT ?`
+
+	// sharedIPsTopCHSQL is sharedIPsTopSQL with ClickHouse's uniq() in place of
+	// the exact distinct counts (see Manager.ApproxCountDistinct).
+	sharedIPsTopCHSQL = `
+		SELECT ip, uniq(token_id) as token_count,
+			uniq(user_id) as user_count,
+			COUNT(*) as request_count
+		FROM logs
+		WHERE created_at >= ? AND ip IS NOT NULL AND ip <> ''
+		GROUP BY ip
+		HAVING uniq(token_id) >= ?
+		ORDER BY token_count DESC
+		LIMIT ?`
+
+	// The IP-wide totals ride along on every grouped row (CROSS JOIN against a
+	// one-row aggregate), so the lookup is a single round trip. No rows means
+	// the IP has no logs in the window, and the totals are zero anyway.
+	ipLookupSQL = `
+		SELECT g.*, t.total_requests, t.unique_users, t.unique_tokens
+		FROM (
+			SELECT l.user_id, COALESCE(l.username, '') as username,
+				l.token_id, COALESCE(l.token_name, '') as token_name,
+				COUNT(*) as request_count,
+				MIN(l.created_at) as first_seen, MAX(l.created_at) as last_seen
+			FROM logs l
+			WHERE l.created_at >= ? AND l.ip = ?
+			GROUP BY l.user_id, l.username, l.token_id, l.token_name
+			ORDER BY request_count DESC
+			LIMIT ?
+		) g
+		CROSS JOIN (
+			SELECT COUNT(*) as total_requests,
+				COUNT(DISTINCT user_id) as unique_users,
+				COUNT(DISTINCT token_id) as unique_tokens
+			FROM logs
+			WHERE created_at >= ? AND ip = ?
+		) t
+		ORDER BY g.request_count DESC`
+
+	ipLookupModelsSQL = `
+		SELECT model_name as model, COUNT(*) as count
+		FROM logs
+		WHERE created_at >= ? AND ip = ? AND model_name IS NOT NULL AND model_name <> ''
+		GROUP BY model_name
+		ORDER BY count DESC
+		LIMIT 20`
+
+	userIPsSQL = `
+		SELECT ip, COUNT(*) as request_count,
+			MIN(created_at) as first_seen, MAX(created_at) as last_seen
+		FROM logs
+		WHERE user_id = ? AND created_at >= ? AND ip IS NOT NULL AND ip <> ''
+		GROUP BY ip
+		ORDER BY request_count DESC`
+)
+
+// IPMonitoringWarmInterval is how often recently requested lists are recomputed
+// in the background: a little under ipMonitoringCacheTTL, so entries are
+// replaced before they expire and readers never wait on the aggregation.
+const IPMonitoringWarmInterval = ipMonitoringCacheTTL * 4 / 5
+
+// ipMonitoringWarmIdle stops background refreshes of a list nobody has asked
+// for in this long.
+const ipMonitoringWarmIdle = 30 * time.Minute
+
+// ipMonitoringWarmSet tracks recently requested lists by cache key
+// (*ipMonitoringWarmEntry), so warming follows actual window/threshold usage
+// instead of refreshing every combination.
+var ipMonitoringWarmSet sync.Map
+
+type ipMonitoringWarmEntry struct {
+	load          func() (map[string]interface{}, bool)
+	lastRequested atomic.Int64 // unix seconds
+}
+
+// ipMonitoringWarmMaxLists caps how many lists each warm-up pass refreshes.
+// Thresholds come straight from the query string, so every distinct value is a
+// new key; past the cap the least recently requested lists are forgotten.
+const ipMonitoringWarmMaxLists = 32
+
+// noteIPMonitoringRequest records that key was requested, keeping it warm.
+func noteIPMonitoringRequest(key string, load func() (map[string]interface{}, bool)) {
+	v, ok := ipMonitoringWarmSet.Load(key)
+	if !ok {
+		v, _ = ipMonitoringWarmSet.LoadOrStore(key, &ipMonitoringWarmEntry{load: load})
+	}
+	v.(*ipMonitoringWarmEntry).lastRequested.Store(time.Now().Unix())
+}
+
+// ipMonitoringWarmWorkers bounds how many lists WarmIPMonitoringCache
+// recomputes at once: enough to overlap the aggregations on the pooled
+// connections without letting a warm-up pass crowd out request traffic.
+const ipMonitoringWarmWorkers = 4
+
+// WarmIPMonitoringCache recomputes the lists requested within the last
+// ipMonitoringWarmIdle, up to ipMonitoringWarmWorkers at a time, and forgets
+// the rest. Across instances a per-key Redis lock lets only one of them refresh
+// each list per interval. It also sweeps expired L1 entries. It returns the
+// number of lists refreshed.
+func WarmIPMonitoringCache() int {
+	sweepIPMonitoringL1(time.Now())
+	var refreshed atomic.Int64
+	var g errgroup.Group
+	g.SetLimit(ipMonitoringWarmWorkers)
+	for key, entry := range trimIPMonitoringWarmSet(time.Now().Add(-ipMonitoringWarmIdle).Unix()) {
+		if locked, err := cache.Get().SetNX("ip:warm:"+key, 1, IPMonitoringWarmInterval*9/10); err != nil || !locked {
+			continue
+		}
+		key, entry := key, entry
+		g.Go(func() error {
+			// The caller's recover does not reach these goroutines; a failing
+			// list must not take the server down.
+			defer func() {
+				if r := recover(); r != nil {
+					logger.L.Error(fmt.Sprintf("[IP监控] 预热列表 %s panic: %v", key, r))
+				}
+			}()
+			fillIPMonitoringCache(key, true, entry.load)
+			refreshed.Add(1)
+			return nil
+		})
+	}
+	g.Wait()
+	return int(refreshed.Load())
+}
+
+// trimIPMonitoringWarmSet forgets lists last requested before cutoff and, past
+// ipMonitoringWarmMaxLists, the least recently requested of the rest. It
+// returns the lists that remain.
+func trimIPMonitoringWarmSet(cutoff int64) map[string]*ipMonitoringWarmEntry {
+	type warmItem struct {
+		key   string
+		entry *ipMonitoringWarmEntry
+		last  int64
+	}
+	var items []warmItem
+	ipMonitoringWarmSet.Range(func(k, v interface{}) bool {
+		key := k.(string)
+		entry := v.(*ipMonitoringWarmEntry)
+		last := entry.lastRequested.Load()
+		if last < cutoff {
+			ipMonitoringWarmSet.Delete(key)
+			return true
+		}
+		items = append(items, warmItem{key: key, entry: entry, last: last})
+		return true
+	})
+	if len(items) > ipMonitoringWarmMaxLists {
+		sort.Slice(items, func(i, j int) bool { return items[i].last > items[j].last })
+		for _, item := range items[ipMonitoringWarmMaxLists:] {
+			ipMonitoringWarmSet.Delete(item.key)
+		}
+		items = items[:ipMonitoringWarmMaxLists]
+	}
+	live := make(map[string]*ipMonitoringWarmEntry, len(items))
+	for _, item := range items {
+		live[item.key] = item.entry
+	}
+	return live
+}
+
+// sharedIPsWithTokensPGSQL answers the shared-IP list and each IP's busiest
+// tokens in one PostgreSQL statement: the Top-N IPs are materialized once, the
+// window is scanned once for just those IPs with ROW_NUMBER ranking tokens per
+// IP, and the kept tokens are folded into a JSON array per IP. Arguments are
+// those of sharedIPsTopSQL followed by the start time again.
+var sharedIPsWithTokensPGSQL = fmt.Sprintf(`
+	WITH ip_stats AS (%s),
+	tok AS (
+		SELECT grouped.*,
+			ROW_NUMBER() OVER (PARTITION BY grouped.ip ORDER BY grouped.request_count DESC) as rn
+		FROM (
+			SELECT l.ip, l.token_id,
+				COALESCE(l.token_name, '') as token_name,
+				l.user_id,
+				COALESCE(l.username, '') as username,
+				COUNT(*) as request_count
+			FROM logs l
+			WHERE l.created_at >= ? AND l.ip IN (SELECT ip FROM ip_stats)
+			GROUP BY l.ip, l.token_id, l.token_name, l.user_id, l.username
+		) grouped
+	)
+	SELECT s.ip, s.token_count, s.user_count, s.request_count,
+		(COALESCE(json_agg(json_build_object(
+			'token_id', t.token_id, 'token_name', t.token_name,
+			'user_id', t.user_id, 'username', t.username,
+			'request_count', t.request_count
+		) ORDER BY t.request_count DESC) FILTER (WHERE t.ip IS NOT NULL), '[]'::json))::text as tokens
+	FROM ip_stats s
+	LEFT JOIN tok t ON t.ip = s.ip AND t.rn <= %d
+	GROUP BY s.ip, s.token_count, s.user_count, s.request_count
+	ORDER BY s.token_count DESC`, sharedIPsTopSQL, sharedIPTokenDetailLimit)
+
+// sharedIPsWithTokensSQL is the MySQL/SQLite form of sharedIPsWithTokensPGSQL.
+// Lacking an ordered JSON aggregate, it returns one row per (IP, kept token)
+// pair, IPs contiguous and ordered like sharedIPsTopSQL, for foldDetailRows
+// to regroup. ClickHouse keeps the two-query path: its
+// LEFT JOIN fills unmatched columns with defaults rather than NULL.
+var sharedIPsWithTokensSQL = fmt.Sprintf(`
+	WITH ip_stats AS (%s),
+	tok AS (
+		SELECT grouped.*,
+			ROW_NUMBER() OVER (PARTITION BY grouped.ip ORDER BY grouped.request_count DESC) as rn
+		FROM (
+			SELECT l.ip, l.token_id,
+				COALESCE(l.token_name, '') as token_name,
+				l.user_id,
+				COALESCE(l.username, '') as username,
+				COUNT(*) as request_count
+			FROM logs l
+			JOIN ip_stats s ON s.ip = l.ip
+			WHERE l.created_at >= ?
+			GROUP BY l.ip, l.token_id, l.token_name, l.user_id, l.username
+		) grouped
+	)
+	SELECT s.ip, s.token_count, s.user_count, s.request_count,
+		t.token_id, t.token_name, t.user_id, t.username,
+		t.request_count as token_request_count
+	FROM ip_stats s
+	LEFT JOIN tok t ON t.ip = s.ip AND t.rn <= %d
+	ORDER BY s.token_count DESC, s.ip, t.request_count DESC`, sharedIPsTopSQL, sharedIPTokenDetailLimit)
+
+// detailColumn maps a result column of a flattened Top-N + detail query to
+// its key in the regrouped detail objects.
+type detailColumn struct {
+	column string
+	key    string
+}
+
+var sharedIPTokenDetailColumns = []detailColumn{
+	{"token_id", "token_id"},
+	{"token_name", "token_name"},
+	{"user_id", "user_id"},
+	{"username", "username"},
+	{"token_request_count", "request_count"},
+}
+
+// ipDetailColumns are the detail columns of queryTopWithIPDetailsFlat.
+var ipDetailColumns = []detailColumn{
+	{"detail_ip", "ip"},
+	{"detail_request_count", "request_count"},
+}
+
+// foldDetailRows regroups the flat rows of a fused Top-N + detail query, where
+// each top row repeats once per kept detail with its rows contiguous, into one
+// row per top item. topColumns are copied to the item and identify it; the
+// details are stored in item[detailField] in query order. A NULL first detail
+// column marks a top row the LEFT JOIN found no details for.
+func foldDetailRows(flat []map[string]interface{}, topColumns []string, details []detailColumn, detailField string) []map[string]interface{} {
+	rows := make([]map[string]interface{}, 0, len(flat))
+	var current map[string]interface{}
+	var items []map[string]interface{}
+	for _, r := range flat {
+		if current == nil || !sameColumns(current, r, topColumns) {
+			if current != nil {
+				current[detailField] = items
+			}
+			current = make(map[string]interface{}, len(topColumns)+1)
+			for _, c := range topColumns {
+				current[c] = r[c]
+			}
+			items = []map[string]interface{}{}
+			rows = append(rows, current)
+		}
+		if r[details[0].column] != nil {
+			item := make(map[string]interface{}, len(details))
+			for _, d := range details {
+				item[d.key] = r[d.column]
+			}
+			items = append(items, item)
+		}
+	}
+	if current != nil {
+		current[detailField] = items
+	}
+	return rows
+}
+
+func sameColumns(a, b map[string]interface{}, columns []string) bool {
+	for _, c := range columns {
+		if a[c] != b[c] {
+			return false
+		}
+	}
+	return true
+}
+
 // NewIPMonitoringService creates a new IPMonitoringService
 func NewIPMonitoringService() *IPMonitoringService {
 	return &IPMonitoringService{db: database.Get(), logDB: database.GetLog()}
@@ -41,33 +563,27 @@ func NewIPMonitoringService() *IPMonitoringService {
 // GetIPStats returns IP recording statistics matching the Python format:
 // {total_users, enabled_count, disabled_count, enabled_percentage, unique_ips_24h}
 func (s *IPMonitoringService) GetIPStats() (map[string]interface{}, error) {
+	// The 24h unique-IP count reads logs, which may live in a separate log
+	// database, so it cannot share a statement with the users query; run it
+	// concurrently instead of after it.
+	uniqueIPsCh := make(chan int64, 1)
+	go func() {
+		startTime := time.Now().Unix() - 86400
+		ipRows, _ := s.logDB.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindStatic(uniqueIPs24hSQL), startTime)
+		uniqueIPs := int64(0)
+		if len(ipRows) > 0 {
+			uniqueIPs = toInt64(ipRows[0]["unique_ips"])
+		}
+		uniqueIPsCh <- uniqueIPs
+	}()
+
 	// Query total users and those with IP recording enabled
-	var userSQL string
+	userSQL := ipStatsUsersMySQLSQL
 	if s.db.IsPG {
-		userSQL = `
-			SELECT
-				COUNT(*) as total_users,
-				SUM(CASE
-					WHEN setting IS NOT NULL AND setting <> ''
-						 AND setting::jsonb->>'record_ip_log' = 'true' THEN 1
-					ELSE 0
-				END) as enabled_count
-			FROM users
-			WHERE deleted_at IS NULL`
-	} else {
-		userSQL = `
-			SELECT
-				COUNT(*) as total_users,
-				SUM(CASE
-					WHEN setting IS NOT NULL AND setting <> ''
-						 AND JSON_EXTRACT(setting, '$.record_ip_log') = true THEN 1
-					ELSE 0
-				END) as enabled_count
-			FROM users
-			WHERE deleted_at IS NULL`
-	}
-
-	row, err := s.db.QueryOneWithTimeout(ipMonitoringQueryTimeout, userSQL)
+		userSQL = ipStatsUsersPGSQL
+	}
+
+	userRows, err := s.db.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, userSQL)
 	if err != nil {
 		return map[string]interface{}{
 			"total_users":        0,
@@ -80,9 +596,9 @@ func (s *IPMonitoringService) GetIPStats() (map[string]interface{}, error) {
 
 	totalUsers := int64(0)
 	enabledCount := int64(0)
-	if row != nil {
-		totalUsers = toInt64(row["total_users"])
-		enabledCount = toInt64(row["enabled_count"])
+	if len(userRows) > 0 {
+		totalUsers = toInt64(userRows[0]["total_users"])
+		enabledCount = toInt64(userRows[0]["enabled_count"])
 	}
 	disabledCount := totalUsers - enabledCount
 	enabledPercentage := 0.0
@@ -90,69 +606,71 @@ func (s *IPMonitoringService) GetIPStats() (map[string]interface{}, error) {
 		enabledPercentage = float64(enabledCount) / float64(totalUsers) * 100
 	}
 
-	// Get unique IPs in last 24h
-	startTime := time.Now().Unix() - 86400
-	ipRow, _ := s.logDB.QueryOneWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindQuery(
-		"SELECT COUNT(DISTINCT ip) as unique_ips FROM logs WHERE created_at >= ? AND ip IS NOT NULL AND ip <> ''"),
-		startTime)
-	uniqueIPs := int64(0)
-	if ipRow != nil {
-		uniqueIPs = toInt64(ipRow["unique_ips"])
-	}
-
 	return map[string]interface{}{
 		"total_users":        totalUsers,
 		"enabled_count":      enabledCount,
 		"disabled_count":     disabledCount,
 		"enabled_percentage": enabledPercentage,
-		"unique_ips_24h":     uniqueIPs,
+		"unique_ips_24h":     <-uniqueIPsCh,
 	}, nil
 }
 
 // GetSharedIPs returns IPs used by multiple tokens with full token details
 func (s *IPMonitoringService) GetSharedIPs(window string, minTokens, limit int, noCache bool) (map[string]interface{}, error) {
-	seconds, ok := WindowSeconds[window]
-	if !ok {
-		seconds = 86400
-	}
-	startTime := time.Now().Unix() - seconds
-
+	fetchLimit := max(limit, ipMonitoringPrefetchLimit)
 	// Check cache
-	cacheKey := fmt.Sprintf("ip:shared:%s:%d:%d", window, minTokens, limit)
-	cm := cache.Get()
-	var cached map[string]interface{}
+	cacheKey := ipMonitoringCacheKey("shared", window, minTokens, fetchLimit)
+	load := func() (map[string]interface{}, bool) {
+		return s.querySharedIPs(window, minTokens, fetchLimit)
+	}
+	noteIPMonitoringRequest(cacheKey, load)
 	if !noCache {
-		found, _ := cm.GetJSON(cacheKey, &cached)
-		if found {
-			return cached, nil
+		if cached, found := loadIPMonitoringCache(cacheKey); found {
+			return limitIPMonitoringItems(cached, limit), nil
 		}
 	}
 
-	// Get IPs with multiple tokens — use parameterized queries
-	query := s.logDB.RebindQuery(`
-		SELECT ip, COUNT(DISTINCT token_id) as token_count,
-			COUNT(DISTINCT user_id) as user_count,
-			COUNT(*) as request_count
-		FROM logs
-		WHERE created_at >= ? AND ip IS NOT NULL AND ip <> ''
-		GROUP BY ip
-		HAVING COUNT(DISTINCT token_id) >= ?
-		ORDER BY token_count DESC
-		LIMIT ?`)
+	result := fillIPMonitoringCache(cacheKey, noCache, load)
+	return limitIPMonitoringItems(result, limit), nil
+}
 
-	rows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, query, startTime, minTokens, limit)
+// querySharedIPs runs the shared-IP aggregation. The bool is false for the
+// fallback result returned after a query error, which must not be cached.
+func (s *IPMonitoringService) querySharedIPs(window string, minTokens, limit int) (map[string]interface{}, bool) {
+	startTime := windowStartTime(window)
+
+	// Get IPs with multiple tokens — use parameterized queries
+	var rows []map[string]interface{}
+	var err error
+	switch {
+	case s.logDB.IsPG:
+		rows, err = s.logDB.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindStatic(sharedIPsWithTokensPGSQL), startTime, minTokens, limit, startTime)
+	case s.logDB.IsCH:
+		rows, err = s.logDB.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindStatic(sharedIPsTopCHSQL), startTime, minTokens, limit)
+	default:
+		var flat []map[string]interface{}
+		flat, err = s.logDB.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindStatic(sharedIPsWithTokensSQL), startTime, minTokens, limit, startTime)
+		rows = foldDetailRows(flat, []string{"ip", "token_count", "user_count", "request_count"}, sharedIPTokenDetailColumns, "tokens")
+	}
 	if err != nil {
 		return map[string]interface{}{
 			"items":      []interface{}{},
 			"total":      0,
 			"window":     window,
 			"min_tokens": minTokens,
-		}, nil
+		}, false
 	}
 
-	// Batch fetch token details for all shared IPs
-	if len(rows) > 0 {
-		ips := make([]interface{}, 0, len(rows))
+	if s.logDB.IsPG {
+		for _, row := range rows {
+			row["tokens"] = json.RawMessage(toString(row["tokens"]))
+		}
+	}
+
+	// Batch fetch token details for all shared IPs (only ClickHouse still needs
+	// the second query)
+	if len(rows) > 0 && s.logDB.IsCH {
+		ips := make([]string, 0, len(rows))
 		for _, row := range rows {
 			if ip, _ := row["ip"].(string); ip != "" {
 				ips = append(ips, ip)
@@ -160,9 +678,9 @@ func (s *IPMonitoringService) GetSharedIPs(window string, minTokens, limit int,
 		}
 
 		if len(ips) > 0 {
-			placeholders := buildPlaceholders(s.logDB.IsPG, len(ips), 2) // start at $2 for PG
+			ipFilter, ipArgs := stringInClause("l.ip", ips)
 			args := []interface{}{startTime}
-			args = append(args, ips...)
+			args = append(args, ipArgs...)
 
 			// logs 已反范式存 token_name/username，直接用，无需 JOIN tokens/users（兼容日志独立库）
 			tokenQuery := s.logDB.RebindQuery(fmt.Sprintf(`
@@ -177,22 +695,17 @@ func (s *IPMonitoringService) GetSharedIPs(window string, minTokens, limit int,
 								COALESCE(l.username, '') as username,
 								COUNT(*) as request_count
 							FROM logs l
-							WHERE l.created_at >= ? AND l.ip IN (%s)
+							WHERE l.created_at >= ? AND %s
 							GROUP BY l.ip, l.token_id, l.token_name, l.user_id, l.username
 						) grouped
 					) ranked
 					WHERE rn <= %d
-					ORDER BY ip, request_count DESC`, placeholders, sharedIPTokenDetailLimit))
+					ORDER BY ip, request_count DESC`, ipFilter, sharedIPTokenDetailLimit))
 
 			tokenRows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, tokenQuery, args...)
 			if err == nil {
 				// Group tokens by IP
-				tokensByIP := map[string][]map[string]interface{}{}
-				for _, tr := range tokenRows {
-					ip := toString(tr["ip"])
-					delete(tr, "ip")
-					tokensByIP[ip] = append(tokensByIP[ip], tr)
-				}
+				tokensByIP := groupSortedRows(tokenRows, "ip", toString, len(rows))
 				for _, row := range rows {
 					ip, _ := row["ip"].(string)
 					if tokens, ok := tokensByIP[ip]; ok {
@@ -216,67 +729,82 @@ func (s *IPMonitoringService) GetSharedIPs(window string, minTokens, limit int,
 		"min_tokens": minTokens,
 	}
 
-	cm.Set(cacheKey, result, 5*time.Minute)
-	return result, nil
+	return result, true
 }
 
 // GetMultiIPTokens returns tokens used from multiple IPs with IP details
 func (s *IPMonitoringService) GetMultiIPTokens(window string, minIPs, limit int, noCache bool) (map[string]interface{}, error) {
-	seconds, ok := WindowSeconds[window]
-	if !ok {
-		seconds = 86400
+	fetchLimit := max(limit, ipMonitoringPrefetchLimit)
+	cacheKey := ipMonitoringCacheKey("multi_token", window, minIPs, fetchLimit)
+	load := func() (map[string]interface{}, bool) {
+		return s.queryMultiIPTokens(window, minIPs, fetchLimit)
 	}
-	startTime := time.Now().Unix() - seconds
-
-	cacheKey := fmt.Sprintf("ip:multi_token:%s:%d:%d", window, minIPs, limit)
-	cm := cache.Get()
-	var cached map[string]interface{}
+	noteIPMonitoringRequest(cacheKey, load)
 	if !noCache {
-		found, _ := cm.GetJSON(cacheKey, &cached)
-		if found {
-			return cached, nil
+		if cached, found := loadIPMonitoringCache(cacheKey); found {
+			return limitIPMonitoringItems(cached, limit), nil
 		}
 	}
 
+	result := fillIPMonitoringCache(cacheKey, noCache, load)
+	return limitIPMonitoringItems(result, limit), nil
+}
+
+// queryMultiIPTokens runs the multi-IP token aggregation. The bool is false for the
+// fallback result returned after a query error, which must not be cached.
+func (s *IPMonitoringService) queryMultiIPTokens(window string, minIPs, limit int) (map[string]interface{}, bool) {
+	startTime := windowStartTime(window)
+
 	wlCond, wlArgs := PanelWhitelistNotInClause("l.user_id")
 	wlSQL := ""
 	if wlCond != "" {
 		wlSQL = " AND " + wlCond
 	}
-	query := s.logDB.RebindQuery(fmt.Sprintf(`
+	ipCount := s.logDB.ApproxCountDistinct("l.ip")
+	topSQL := fmt.Sprintf(`
 		SELECT l.token_id, COALESCE(l.token_name, '') as token_name,
 			l.user_id, COALESCE(l.username, '') as username,
-			COUNT(DISTINCT l.ip) as ip_count, COUNT(*) as request_count
+			%s as ip_count, COUNT(*) as request_count
 		FROM logs l
 		WHERE l.created_at >= ? AND l.ip IS NOT NULL AND l.ip <> ''%s
 		GROUP BY l.token_id, l.token_name, l.user_id, l.username
-		HAVING COUNT(DISTINCT l.ip) >= ?
+		HAVING %s >= ?
 		ORDER BY ip_count DESC
-		LIMIT ?`, wlSQL))
+		LIMIT ?`, ipCount, wlSQL, ipCount)
 
 	qArgs := []interface{}{startTime}
 	qArgs = append(qArgs, wlArgs...)
 	qArgs = append(qArgs, minIPs, limit)
-	rows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, query, qArgs...)
+
+	var rows []map[string]interface{}
+	var err error
+	switch {
+	case s.logDB.IsPG:
+		rows, err = s.queryTopWithIPDetailsPG(topSQL, qArgs, "token_id", tokenIPDetailLimit, startTime, "ips")
+	case s.logDB.IsCH:
+		rows, err = s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindQuery(topSQL), qArgs...)
+	default:
+		rows, err = s.queryTopWithIPDetailsFlat(topSQL, qArgs, "token_id", multiIPTokenColumns, tokenIPDetailLimit, startTime, "ips")
+	}
 	if err != nil {
 		return map[string]interface{}{
 			"items":   []interface{}{},
 			"total":   0,
 			"window":  window,
 			"min_ips": minIPs,
-		}, nil
+		}, false
 	}
 
-	// Batch fetch IP details for all tokens
-	if len(rows) > 0 {
-		tokenIDs := make([]interface{}, 0, len(rows))
+	// Batch fetch IP details for all tokens (only ClickHouse lacks them here)
+	if len(rows) > 0 && s.logDB.IsCH {
+		tokenIDs := make([]int64, 0, len(rows))
 		for _, row := range rows {
 			tokenIDs = append(tokenIDs, toInt64(row["token_id"]))
 		}
 
-		placeholders := buildPlaceholders(s.logDB.IsPG, len(tokenIDs), 2)
+		tokenFilter, tokenArgs := int64InClause("token_id", tokenIDs)
 		args := []interface{}{startTime}
-		args = append(args, tokenIDs...)
+		args = append(args, tokenArgs...)
 
 		ipQuery := s.logDB.RebindQuery(fmt.Sprintf(`
 				SELECT token_id, ip, request_count
@@ -286,22 +814,17 @@ func (s *IPMonitoringService) GetMultiIPTokens(window string, minIPs, limit int,
 					FROM (
 						SELECT token_id, ip, COUNT(*) as request_count
 						FROM logs
-						WHERE created_at >= ? AND token_id IN (%s) AND ip IS NOT NULL AND ip <> ''
+						WHERE created_at >= ? AND %s AND ip IS NOT NULL AND ip <> ''
 						GROUP BY token_id, ip
 					) grouped
 				) ranked
 				WHERE rn <= %d
-				ORDER BY token_id, request_count DESC`, placeholders, tokenIPDetailLimit))
+				ORDER BY token_id, request_count DESC`, tokenFilter, tokenIPDetailLimit))
 
 		ipRows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, ipQuery, args...)
 		if err == nil {
 			// Group IPs by token_id. SQL already limits each group.
-			ipsByToken := map[int64][]map[string]interface{}{}
-			for _, ir := range ipRows {
-				tid := toInt64(ir["token_id"])
-				delete(ir, "token_id")
-				ipsByToken[tid] = append(ipsByToken[tid], ir)
-			}
+			ipsByToken := groupSortedRows(ipRows, "token_id", toInt64, len(rows))
 			for _, row := range rows {
 				tid := toInt64(row["token_id"])
 				if ips, ok := ipsByToken[tid]; ok {
@@ -324,66 +847,81 @@ func (s *IPMonitoringService) GetMultiIPTokens(window string, minIPs, limit int,
 		"min_ips": minIPs,
 	}
 
-	cm.Set(cacheKey, result, 5*time.Minute)
-	return result, nil
+	return result, true
 }
 
 // GetMultiIPUsers returns users accessing from multiple IPs with top IP details
 func (s *IPMonitoringService) GetMultiIPUsers(window string, minIPs, limit int, noCache bool) (map[string]interface{}, error) {
-	seconds, ok := WindowSeconds[window]
-	if !ok {
-		seconds = 86400
+	fetchLimit := max(limit, ipMonitoringPrefetchLimit)
+	cacheKey := ipMonitoringCacheKey("multi_user", window, minIPs, fetchLimit)
+	load := func() (map[string]interface{}, bool) {
+		return s.queryMultiIPUsers(window, minIPs, fetchLimit)
 	}
-	startTime := time.Now().Unix() - seconds
-
-	cacheKey := fmt.Sprintf("ip:multi_user:%s:%d:%d", window, minIPs, limit)
-	cm := cache.Get()
-	var cached map[string]interface{}
+	noteIPMonitoringRequest(cacheKey, load)
 	if !noCache {
-		found, _ := cm.GetJSON(cacheKey, &cached)
-		if found {
-			return cached, nil
+		if cached, found := loadIPMonitoringCache(cacheKey); found {
+			return limitIPMonitoringItems(cached, limit), nil
 		}
 	}
 
+	result := fillIPMonitoringCache(cacheKey, noCache, load)
+	return limitIPMonitoringItems(result, limit), nil
+}
+
+// queryMultiIPUsers runs the multi-IP user aggregation. The bool is false for the
+// fallback result returned after a query error, which must not be cached.
+func (s *IPMonitoringService) queryMultiIPUsers(window string, minIPs, limit int) (map[string]interface{}, bool) {
+	startTime := windowStartTime(window)
+
 	wlCond, wlArgs := PanelWhitelistNotInClause("l.user_id")
 	wlSQL := ""
 	if wlCond != "" {
 		wlSQL = " AND " + wlCond
 	}
-	query := s.logDB.RebindQuery(fmt.Sprintf(`
+	ipCount := s.logDB.ApproxCountDistinct("l.ip")
+	topSQL := fmt.Sprintf(`
 		SELECT l.user_id, COALESCE(l.username, '') as username,
-			COUNT(DISTINCT l.ip) as ip_count, COUNT(*) as request_count
+			%s as ip_count, COUNT(*) as request_count
 		FROM logs l
 		WHERE l.created_at >= ? AND l.ip IS NOT NULL AND l.ip <> ''%s
 		GROUP BY l.user_id, l.username
-		HAVING COUNT(DISTINCT l.ip) >= ?
+		HAVING %s >= ?
 		ORDER BY ip_count DESC
-		LIMIT ?`, wlSQL))
+		LIMIT ?`, ipCount, wlSQL, ipCount)
 
 	qArgs := []interface{}{startTime}
 	qArgs = append(qArgs, wlArgs...)
 	qArgs = append(qArgs, minIPs, limit)
-	rows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, query, qArgs...)
+
+	var rows []map[string]interface{}
+	var err error
+	switch {
+	case s.logDB.IsPG:
+		rows, err = s.queryTopWithIPDetailsPG(topSQL, qArgs, "user_id", userIPDetailLimit, startTime, "top_ips")
+	case s.logDB.IsCH:
+		rows, err = s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindQuery(topSQL), qArgs...)
+	default:
+		rows, err = s.queryTopWithIPDetailsFlat(topSQL, qArgs, "user_id", multiIPUserColumns, userIPDetailLimit, startTime, "top_ips")
+	}
 	if err != nil {
 		return map[string]interface{}{
 			"items":   []interface{}{},
 			"total":   0,
 			"window":  window,
 			"min_ips": minIPs,
-		}, nil
+		}, false
 	}
 
-	// Batch fetch top IPs for all users
-	if len(rows) > 0 {
-		userIDs := make([]interface{}, 0, len(rows))
+	// Batch fetch top IPs for all users (only ClickHouse lacks them here)
+	if len(rows) > 0 && s.logDB.IsCH {
+		userIDs := make([]int64, 0, len(rows))
 		for _, row := range rows {
 			userIDs = append(userIDs, toInt64(row["user_id"]))
 		}
 
-		placeholders := buildPlaceholders(s.logDB.IsPG, len(userIDs), 2)
+		userFilter, userArgs := int64InClause("user_id", userIDs)
 		args := []interface{}{startTime}
-		args = append(args, userIDs...)
+		args = append(args, userArgs...)
 
 		ipQuery := s.logDB.RebindQuery(fmt.Sprintf(`
 				SELECT user_id, ip, request_count
@@ -393,22 +931,17 @@ func (s *IPMonitoringService) GetMultiIPUsers(window string, minIPs, limit int,
 					FROM (
 						SELECT user_id, ip, COUNT(*) as request_count
 						FROM logs
-						WHERE created_at >= ? AND user_id IN (%s) AND ip IS NOT NULL AND ip <> ''
+						WHERE created_at >= ? AND %s AND ip IS NOT NULL AND ip <> ''
 						GROUP BY user_id, ip
 					) grouped
 				) ranked
 				WHERE rn <= %d
-				ORDER BY user_id, request_count DESC`, placeholders, userIPDetailLimit))
+				ORDER BY user_id, request_count DESC`, userFilter, userIPDetailLimit))
 
 		ipRows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, ipQuery, args...)
 		if err == nil {
 			// Group IPs by user_id. SQL already limits each group.
-			ipsByUser := map[int64][]map[string]interface{}{}
-			for _, ir := range ipRows {
-				uid := toInt64(ir["user_id"])
-				delete(ir, "user_id")
-				ipsByUser[uid] = append(ipsByUser[uid], ir)
-			}
+			ipsByUser := groupSortedRows(ipRows, "user_id", toInt64, len(rows))
 			for _, row := range rows {
 				uid := toInt64(row["user_id"])
 				if ips, ok := ipsByUser[uid]; ok {
@@ -431,60 +964,129 @@ func (s *IPMonitoringService) GetMultiIPUsers(window string, minIPs, limit int,
 		"min_ips": minIPs,
 	}
 
-	cm.Set(cacheKey, result, 5*time.Minute)
-	return result, nil
+	return result, true
 }
 
-// LookupIPUsers finds all users/tokens using a specific IP
-func (s *IPMonitoringService) LookupIPUsers(ip, window string, limit int, includeGeo bool) (map[string]interface{}, error) {
-	seconds, ok := WindowSeconds[window]
-	if !ok {
-		seconds = 86400
-	}
-	startTime := time.Now().Unix() - seconds
+// queryTopWithIPDetailsPG runs a Top-N aggregate and its per-row IP breakdown as
+// one PostgreSQL statement: topSQL (with ? placeholders, not yet rebound)
+// becomes a CTE and every kept row pulls its busiest IPs through LEFT JOIN
+// LATERAL, so the detail lookup costs no second round trip or planning pass.
+// keyColumn is the logs column matched against the CTE row; the breakdown is
+// stored in row[detailField] as raw JSON that encodes to the same shape as the
+// two-query path.
+func (s *IPMonitoringService) queryTopWithIPDetailsPG(topSQL string, topArgs []interface{}, keyColumn string, detailLimit int, startTime int64, detailField string) ([]map[string]interface{}, error) {
+	query := s.logDB.RebindQuery(fmt.Sprintf(`
+		WITH top_rows AS (%s)
+		SELECT top_rows.*, COALESCE(d.ips, '[]') AS ip_details
+		FROM top_rows
+		LEFT JOIN LATERAL (
+			SELECT json_agg(json_build_object('ip', x.ip, 'request_count', x.request_count)
+				ORDER BY x.request_count DESC)::text AS ips
+			FROM (
+				SELECT ip, COUNT(*) AS request_count
+				FROM logs
+				WHERE created_at >= ? AND %s = top_rows.%s AND ip IS NOT NULL AND ip <> ''
+				GROUP BY ip
+				ORDER BY request_count DESC
+				LIMIT %d
+			) x
+		) d ON true
+		ORDER BY top_rows.ip_count DESC`, topSQL, keyColumn, keyColumn, detailLimit))
 
-	statsQuery := s.logDB.RebindQuery(`
-		SELECT COUNT(*) as total_requests,
-			COUNT(DISTINCT user_id) as unique_users,
-			COUNT(DISTINCT token_id) as unique_tokens
-		FROM logs
-		WHERE created_at >= ? AND ip = ?`)
-	statsRow, err := s.logDB.QueryOneWithTimeout(ipMonitoringQueryTimeout, statsQuery, startTime, ip)
+	args := make([]interface{}, 0, len(topArgs)+1)
+	args = append(args, topArgs...)
+	args = append(args, startTime)
+	rows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, query, args...)
 	if err != nil {
 		return nil, err
 	}
 
-	query := s.logDB.RebindQuery(`
-		SELECT l.user_id, COALESCE(l.username, '') as username,
-			l.token_id, COALESCE(l.token_name, '') as token_name,
-			COUNT(*) as request_count,
-			MIN(l.created_at) as first_seen, MAX(l.created_at) as last_seen
-		FROM logs l
-		WHERE l.created_at >= ? AND l.ip = ?
-		GROUP BY l.user_id, l.username, l.token_id, l.token_name
-			ORDER BY request_count DESC
-			LIMIT ?`)
+	for _, row := range rows {
+		// json_agg already produced the response JSON; pass it through instead
+		// of decoding it into maps only for the encoder to rebuild the same text.
+		row[detailField] = json.RawMessage(toString(row["ip_details"]))
+		delete(row, "ip_details")
+	}
+	return rows, nil
+}
 
-	rows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, query, startTime, ip, limit)
+var (
+	multiIPTokenColumns = []string{"token_id", "token_name", "user_id", "username", "ip_count", "request_count"}
+	multiIPUserColumns  = []string{"user_id", "username", "ip_count", "request_count"}
+)
+
+// queryTopWithIPDetailsFlat is the MySQL/SQLite counterpart of
+// queryTopWithIPDetailsPG. Without LATERAL or an ordered JSON aggregate common
+// to both, the IP breakdown is ranked with ROW_NUMBER over just the kept keys
+// and LEFT JOINed back, one row per (top row, kept IP) ordered so each top row
+// stays contiguous; foldDetailRows regroups them into row[detailField].
+// topColumns are the columns topSQL selects. ClickHouse keeps the two-query
+// path for the reason given on sharedIPsWithTokensSQL. topSQL embeds the
+// variable-length panel whitelist, so the text is not prepared.
+func (s *IPMonitoringService) queryTopWithIPDetailsFlat(topSQL string, topArgs []interface{}, keyColumn string, topColumns []string, detailLimit int, startTime int64, detailField string) ([]map[string]interface{}, error) {
+	order := make([]string, len(topColumns))
+	for i, c := range topColumns {
+		order[i] = "top_rows." + c
+	}
+	query := s.logDB.RebindQuery(fmt.Sprintf(`
+		WITH top_rows AS (%s),
+		d AS (
+			SELECT grouped.*,
+				ROW_NUMBER() OVER (PARTITION BY grouped.%s ORDER BY grouped.request_count DESC) as rn
+			FROM (
+				SELECT %s, ip, COUNT(*) as request_count
+				FROM logs
+				WHERE created_at >= ? AND %s IN (SELECT %s FROM top_rows) AND ip IS NOT NULL AND ip <> ''
+				GROUP BY %s, ip
+			) grouped
+		)
+		SELECT top_rows.*, d.ip as detail_ip, d.request_count as detail_request_count
+		FROM top_rows
+		LEFT JOIN d ON d.%s = top_rows.%s AND d.rn <= %d
+		ORDER BY top_rows.ip_count DESC, %s, d.request_count DESC`,
+		topSQL, keyColumn, keyColumn, keyColumn, keyColumn, keyColumn, keyColumn, keyColumn, detailLimit,
+		strings.Join(order, ", ")))
+
+	args := make([]interface{}, 0, len(topArgs)+1)
+	args = append(args, topArgs...)
+	args = append(args, startTime)
+	flat, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, query, args...)
 	if err != nil {
 		return nil, err
 	}
+	return foldDetailRows(flat, topColumns, ipDetailColumns, detailField), nil
+}
 
-	totalRequests := toInt64(statsRow["total_requests"])
-	uniqueUsers := toInt64(statsRow["unique_users"])
-	uniqueTokens := toInt64(statsRow["unique_tokens"])
+// LookupIPUsers finds all users/tokens using a specific IP
+func (s *IPMonitoringService) LookupIPUsers(ip, window string, limit int, includeGeo bool) (map[string]interface{}, error) {
+	startTime := windowStartTime(window)
 
-	// Get model usage for this IP
-	modelQuery := s.logDB.RebindQuery(`
-		SELECT model_name as model, COUNT(*) as count
-		FROM logs
-		WHERE created_at >= ? AND ip = ? AND model_name IS NOT NULL AND model_name <> ''
-		GROUP BY model_name
-		ORDER BY count DESC
-		LIMIT 20`)
-	modelRows, _ := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, modelQuery, startTime, ip)
-	if modelRows == nil {
-		modelRows = []map[string]interface{}{}
+	// The model breakdown is independent of the user/token rows; fetch it
+	// alongside them rather than after.
+	modelsCh := make(chan []map[string]interface{}, 1)
+	go func() {
+		modelRows, _ := s.logDB.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindStatic(ipLookupModelsSQL), startTime, ip)
+		if modelRows == nil {
+			modelRows = []map[string]interface{}{}
+		}
+		modelsCh <- modelRows
+	}()
+
+	rows, err := s.logDB.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindStatic(ipLookupSQL), startTime, ip, limit, startTime, ip)
+	if err != nil {
+		return nil, err
+	}
+
+	var totalRequests, uniqueUsers, uniqueTokens int64
+	if len(rows) > 0 {
+		totalRequests = toInt64(rows[0]["total_requests"])
+		uniqueUsers = toInt64(rows[0]["unique_users"])
+		uniqueTokens = toInt64(rows[0]["unique_tokens"])
+	}
+	for _, row := range rows {
+		delete(row, "total_requests")
+		delete(row, "unique_users")
+		delete(row, "unique_tokens")
 	}
 
 	result := map[string]interface{}{
@@ -495,7 +1097,7 @@ func (s *IPMonitoringService) LookupIPUsers(ip, window string, limit int, includ
 		"total_requests": totalRequests,
 		"unique_users":   uniqueUsers,
 		"unique_tokens":  uniqueTokens,
-		"models":         modelRows,
+		"models":         <-modelsCh,
 	}
 	if includeGeo {
 		result["geo"] = FormatIPGeoInfo(LookupIPGeo(ip))
@@ -505,21 +1107,9 @@ func (s *IPMonitoringService) LookupIPUsers(ip, window string, limit int, includ
 
 // GetUserIPs returns all unique IPs for a user
 func (s *IPMonitoringService) GetUserIPs(userID int64, window string) (map[string]interface{}, error) {
-	seconds, ok := WindowSeconds[window]
-	if !ok {
-		seconds = 86400
-	}
-	startTime := time.Now().Unix() - seconds
+	startTime := windowStartTime(window)
 
-	query := s.logDB.RebindQuery(`
-		SELECT ip, COUNT(*) as request_count,
-			MIN(created_at) as first_seen, MAX(created_at) as last_seen
-		FROM logs
-		WHERE user_id = ? AND created_at >= ? AND ip IS NOT NULL AND ip <> ''
-		GROUP BY ip
-		ORDER BY request_count DESC`)
-
-	rows, err := s.logDB.QueryWithTimeout(ipMonitoringQueryTimeout, query, userID, startTime)
+	rows, err := s.logDB.QueryPreparedWithTimeout(ipMonitoringQueryTimeout, s.logDB.RebindStatic(userIPsSQL), userID, startTime)
 	if err != nil {
 		return nil, err
 	}
@@ -570,6 +1160,7 @@ func (s *IPMonitoringService) GetIPIndexStatus() (map[string]interface{}, error)
 	type indexSpec struct {
 		Name        string
 		Columns     []string
+		Where       string // partial index predicate, if any
 		Purpose     string
 		Recommended bool
 	}
@@ -605,6 +1196,28 @@ func (s *IPMonitoringService) GetIPIndexStatus() (map[string]interface{}, error)
 			Purpose:     "高频 IP 反查建议索引，请在生产手动评估后创建",
 			Recommended: true,
 		},
+		{
+			Name:        "idx_logs_created_ip_token_user",
+			Columns:     []string{"created_at", "ip", "token_id", "user_id"},
+			Purpose:     "共享 IP 聚合覆盖索引（可仅扫索引完成统计），请在生产手动评估后创建",
+			Recommended: true,
+		},
+		{
+			Name:        "idx_logs_token_created_ip",
+			Columns:     []string{"token_id", "created_at", "ip"},
+			Purpose:     "多 IP 令牌明细覆盖索引（按令牌批量取 IP），请在生产手动评估后创建",
+			Recommended: true,
+		},
+	}
+	if s.logDB.IsPG {
+		// MySQL has no partial indexes
+		specs = append(specs, indexSpec{
+			Name:        "idx_logs_user_ip_created_partial",
+			Columns:     []string{"user_id", "ip", "created_at"},
+			Where:       "ip IS NOT NULL AND ip <> ''",
+			Purpose:     "用户 IP 列表部分索引（跳过空 IP 行），请在生产手动评估后创建",
+			Recommended: true,
+		})
 	}
 
 	existingNames := map[string]bool{}
@@ -637,7 +1250,7 @@ func (s *IPMonitoringService) GetIPIndexStatus() (map[string]interface{}, error)
 		if spec.Recommended {
 			recommended++
 		}
-		items = append(items, map[string]interface{}{
+		item := map[string]interface{}{
 			"name":        spec.Name,
 			"table":       "logs",
 			"columns":     spec.Columns,
@@ -645,7 +1258,11 @@ func (s *IPMonitoringService) GetIPIndexStatus() (map[string]interface{}, error)
 			"recommended": spec.Recommended,
 			"auto_create": false,
 			"purpose":     spec.Purpose,
-		})
+		}
+		if spec.Where != "" {
+			item["where"] = spec.Where
+		}
+		items = append(items, item)
 	}
 
 	inspectionError := ""
@@ -665,6 +1282,61 @@ func (s *IPMonitoringService) GetIPIndexStatus() (map[string]interface{}, error)
 	}, nil
 }
 
+// groupSortedRows splits rows that SQL already ordered by column into one group
+// per key, removing column from each row. Each group is normally a sub-slice of
+// rows, so the only allocation is the map, sized for the expected key count.
+func groupSortedRows[K comparable](rows []map[string]interface{}, column string, keyOf func(interface{}) K, keys int) map[K][]map[string]interface{} {
+	groups := make(map[K][]map[string]interface{}, keys)
+	var current K
+	start := 0
+	flush := func(end int) {
+		run := rows[start:end:end]
+		if prev, ok := groups[current]; ok {
+			// Only reachable if the database's ordering split a key's rows
+			run = append(prev[:len(prev):len(prev)], run...)
+		}
+		groups[current] = run
+	}
+	for i, row := range rows {
+		key := keyOf(row[column])
+		delete(row, column)
+		if i > 0 && key != current {
+			flush(i)
+			start = i
+		}
+		current = key
+	}
+	if len(rows) > 0 {
+		flush(len(rows))
+	}
+	return groups
+}
+
+// int64InClause renders a membership filter for a batch follow-up query, one
+// placeholder per value. The SQL uses ? placeholders and must go through
+// RebindQuery; values must be non-empty.
+func int64InClause(column string, values []int64) (string, []interface{}) {
+	args := make([]interface{}, len(values))
+	for i, v := range values {
+		args[i] = v
+	}
+	return column + " IN (" + questionMarks(len(args)) + ")", args
+}
+
+// stringInClause is int64InClause for text columns.
+func stringInClause(column string, values []string) (string, []interface{}) {
+	args := make([]interface{}, len(values))
+	for i, v := range values {
+		args[i] = v
+	}
+	return column + " IN (" + questionMarks(len(args)) + ")", args
+}
+
+// questionMarks returns "?,?,...,?" with n placeholders.
+func questionMarks(n int) string {
+	return strings.Repeat("?,", n-1) + "?"
+}
+
 // buildPlaceholders generates SQL placeholders for IN clauses.
 // For MySQL: returns "?,?,?" (count times)
 // For PostgreSQL: returns "$startIdx,$startIdx+1,..." (count times)
@@ -1,6 +1,7 @@
 package service
 
 import (
+	"encoding/json"
 	"fmt"
 	"testing"
 	"time"
@@ -46,6 +47,14 @@ func clearIPTestCaches(t *testing.T) {
 	cm := cache.Get()
 	cm.DeleteByPrefix("dashboard:ip_distribution:")
 	cm.DeleteByPrefix("ip:")
+	ipMonitoringL1.Range(func(key, _ interface{}) bool {
+		ipMonitoringL1.Delete(key)
+		return true
+	})
+	ipMonitoringWarmSet.Range(func(key, _ interface{}) bool {
+		ipMonitoringWarmSet.Delete(key)
+		return true
+	})
 }
 
 func TestLookupIPUsersIncludesGeoAndFullAggregates(t *testing.T) {
@@ -212,3 +221,94 @@ func TestMultiIPTokenDetailsAreLimitedInSQL(t *testing.T) {
 		t.Fatalf("expected %d detailed IPs, got %d", tokenIPDetailLimit, len(ips))
 	}
 }
+
+func TestSharedIPsPageSizesShareOneCacheEntry(t *testing.T) {
+	installIPMonitoringSchema(t)
+	clearIPTestCaches(t)
+
+	db := NewIPMonitoringService().db.DB
+	now := time.Now().Unix()
+	for i := 1; i <= 3; i++ {
+		for _, tokenID := range []int{10, 20} {
+			if _, err := db.Exec(
+				`INSERT INTO logs (user_id, created_at, type, ip, token_id) VALUES (1, ?, 2, ?, ?)`,
+				now, fmt.Sprintf("10.0.1.%d", i), tokenID,
+			); err != nil {
+				t.Fatal(err)
+			}
+		}
+	}
+
+	small, err := NewIPMonitoringService().GetSharedIPs("24h", 2, 1, false)
+	if err != nil {
+		t.Fatalf("shared ips: %v", err)
+	}
+	if got := len(small["items"].([]map[string]interface{})); got != 1 {
+		t.Fatalf("limit 1 should return one item, got %d", got)
+	}
+
+	// With the logs gone, the larger page can only come from the entry the
+	// first call filled.
+	if _, err := db.Exec(`DELETE FROM logs`); err != nil {
+		t.Fatal(err)
+	}
+	large, err := NewIPMonitoringService().GetSharedIPs("24h", 2, 3, false)
+	if err != nil {
+		t.Fatalf("shared ips: %v", err)
+	}
+	// Cached results keep their items as encoded JSON.
+	data, _ := json.Marshal(large["items"])
+	var cachedItems []json.RawMessage
+	if err := json.Unmarshal(data, &cachedItems); err != nil {
+		t.Fatalf("cached items: %v", err)
+	}
+	if got := len(cachedItems); got != 3 {
+		t.Fatalf("limit 3 should be sliced from the cached list, got %d", got)
+	}
+}
+
+func TestSweepIPMonitoringL1DropsOnlyExpiredEntries(t *testing.T) {
+	clearIPTestCaches(t)
+	now := time.Now()
+	ipMonitoringL1.Store("ip:test:stale", &ipMonitoringL1Entry{expiresAt: now.Add(-time.Second)})
+	ipMonitoringL1.Store("ip:test:fresh", &ipMonitoringL1Entry{expiresAt: now.Add(time.Minute)})
+
+	sweepIPMonitoringL1(now)
+
+	if _, ok := ipMonitoringL1.Load("ip:test:stale"); ok {
+		t.Fatal("expired entry survived the sweep")
+	}
+	if _, ok := ipMonitoringL1.Load("ip:test:fresh"); !ok {
+		t.Fatal("live entry was swept")
+	}
+	clearIPTestCaches(t)
+}
+
+func TestTrimIPMonitoringWarmSetKeepsMostRecentLists(t *testing.T) {
+	clearIPTestCaches(t)
+	now := time.Now().Unix()
+	note := func(key string, last int64) {
+		entry := &ipMonitoringWarmEntry{}
+		entry.lastRequested.Store(last)
+		ipMonitoringWarmSet.Store(key, entry)
+	}
+	note("ip:test:idle", now-3600)
+	for i := 0; i < ipMonitoringWarmMaxLists+5; i++ {
+		note(fmt.Sprintf("ip:test:%d", i), now-int64(i))
+	}
+
+	live := trimIPMonitoringWarmSet(now - 60)
+
+	if len(live) != ipMonitoringWarmMaxLists {
+		t.Fatalf("expected %d warm lists, got %d", ipMonitoringWarmMaxLists, len(live))
+	}
+	for _, key := range []string{"ip:test:idle", fmt.Sprintf("ip:test:%d", ipMonitoringWarmMaxLists)} {
+		if _, ok := ipMonitoringWarmSet.Load(key); ok {
+			t.Fatalf("%s should have been forgotten", key)
+		}
+	}
+	if _, ok := live["ip:test:0"]; !ok {
+		t.Fatal("most recently requested list was dropped")
+	}
+	clearIPTestCaches(t)
+}
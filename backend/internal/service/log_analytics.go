@@ -1,6 +1,7 @@
 package service
 
 import (
+	"encoding/json"
 	"fmt"
 	"math"
 	"time"
@@ -8,6 +9,7 @@ import (
 	"github.com/new-api-tools/backend/internal/cache"
 	"github.com/new-api-tools/backend/internal/database"
 	"github.com/new-api-tools/backend/internal/logger"
+	"golang.org/x/sync/singleflight"
 )
 
 const (
@@ -16,6 +18,16 @@ const (
 	defaultMaxIterations = 100
 )
 
+// analyticsPrefetchLimit is the row count fetched for the rankings and model
+// statistics: the largest limit the endpoints accept. Each list is cached once
+// at this size and every limit is served by truncating it, so a request never
+// gets a shorter list cached by an earlier, smaller one.
+const analyticsPrefetchLimit = 200
+
+// analyticsLogStatsTTL bounds how long the approximate log count and max id are
+// reused; the sync-status poller otherwise queries both on every call.
+const analyticsLogStatsTTL = 60 * time.Second
+
 // LogAnalyticsService handles log analytics via direct DB queries + cache
 type LogAnalyticsService struct {
 	db    *database.Manager
@@ -50,17 +62,11 @@ func (s *LogAnalyticsService) GetAnalyticsState() map[string]interface{} {
 }
 
 // GetUserRequestRanking returns top users by request count
-func (s *LogAnalyticsService) GetUserRequestRanking(limit int) ([]map[string]interface{}, error) {
-	cm := cache.Get()
-	var cached []map[string]interface{}
-	found, _ := cm.GetJSON("analytics:user_request_ranking", &cached)
-	if found && len(cached) > 0 {
-		if limit > 0 && limit < len(cached) {
-			return cached[:limit], nil
-		}
-		return cached, nil
-	}
+func (s *LogAnalyticsService) GetUserRequestRanking(limit int) ([]json.RawMessage, error) {
+	return loadAnalyticsRows("analytics:user_request_ranking", limit, s.queryUserRequestRanking)
+}
 
+func (s *LogAnalyticsService) queryUserRequestRanking() ([]map[string]interface{}, error) {
 	var rows []map[string]interface{}
 	var err error
 
@@ -83,7 +89,7 @@ func (s *LogAnalyticsService) GetUserRequestRanking(limit int) ([]map[string]int
 			ORDER BY request_count DESC
 			LIMIT ?`, wlSQL))
 		qArgs := append([]interface{}{}, wlArgs...)
-		qArgs = append(qArgs, limit)
+		qArgs = append(qArgs, analyticsPrefetchLimit)
 		rows, err = s.db.QueryWithTimeout(30*time.Second, query, qArgs...)
 	} else {
 		// Fallback: scan logs with 30-day filter
@@ -105,29 +111,22 @@ func (s *LogAnalyticsService) GetUserRequestRanking(limit int) ([]map[string]int
 			LIMIT ?`, wlSQL))
 		qArgs := []interface{}{thirtyDaysAgo}
 		qArgs = append(qArgs, wlArgs...)
-		qArgs = append(qArgs, limit)
+		qArgs = append(qArgs, analyticsPrefetchLimit)
 		rows, err = s.logDB.QueryWithTimeout(30*time.Second, query, qArgs...)
 	}
 	if err != nil {
 		return nil, err
 	}
 
-	cm.Set("analytics:user_request_ranking", rows, 5*time.Minute)
 	return rows, nil
 }
 
 // GetUserQuotaRanking returns top users by quota consumption
-func (s *LogAnalyticsService) GetUserQuotaRanking(limit int) ([]map[string]interface{}, error) {
-	cm := cache.Get()
-	var cached []map[string]interface{}
-	found, _ := cm.GetJSON("analytics:user_quota_ranking", &cached)
-	if found && len(cached) > 0 {
-		if limit > 0 && limit < len(cached) {
-			return cached[:limit], nil
-		}
-		return cached, nil
-	}
+func (s *LogAnalyticsService) GetUserQuotaRanking(limit int) ([]json.RawMessage, error) {
+	return loadAnalyticsRows("analytics:user_quota_ranking", limit, s.queryUserQuotaRanking)
+}
 
+func (s *LogAnalyticsService) queryUserQuotaRanking() ([]map[string]interface{}, error) {
 	var rows []map[string]interface{}
 	var err error
 
@@ -149,7 +148,7 @@ func (s *LogAnalyticsService) GetUserQuotaRanking(limit int) ([]map[string]inter
 			ORDER BY quota_used DESC
 			LIMIT ?`, wlSQL))
 		qArgs := append([]interface{}{}, wlArgs...)
-		qArgs = append(qArgs, limit)
+		qArgs = append(qArgs, analyticsPrefetchLimit)
 		rows, err = s.db.QueryWithTimeout(30*time.Second, query, qArgs...)
 	} else {
 		thirtyDaysAgo := time.Now().AddDate(0, 0, -30).Unix()
@@ -170,29 +169,22 @@ func (s *LogAnalyticsService) GetUserQuotaRanking(limit int) ([]map[string]inter
 			LIMIT ?`, wlSQL))
 		qArgs := []interface{}{thirtyDaysAgo}
 		qArgs = append(qArgs, wlArgs...)
-		qArgs = append(qArgs, limit)
+		qArgs = append(qArgs, analyticsPrefetchLimit)
 		rows, err = s.logDB.QueryWithTimeout(30*time.Second, query, qArgs...)
 	}
 	if err != nil {
 		return nil, err
 	}
 
-	cm.Set("analytics:user_quota_ranking", rows, 5*time.Minute)
 	return rows, nil
 }
 
 // GetModelStatistics returns model usage statistics with success_rate and empty_rate
-func (s *LogAnalyticsService) GetModelStatistics(limit int) ([]map[string]interface{}, error) {
-	cm := cache.Get()
-	var cached []map[string]interface{}
-	found, _ := cm.GetJSON("analytics:model_statistics", &cached)
-	if found && len(cached) > 0 {
-		if limit > 0 && limit < len(cached) {
-			return cached[:limit], nil
-		}
-		return cached, nil
-	}
+func (s *LogAnalyticsService) GetModelStatistics(limit int) ([]json.RawMessage, error) {
+	return loadAnalyticsRows("analytics:model_statistics", limit, s.queryModelStatistics)
+}
 
+func (s *LogAnalyticsService) queryModelStatistics() ([]map[string]interface{}, error) {
 	thirtyDaysAgo := time.Now().AddDate(0, 0, -30).Unix()
 	query := s.logDB.RebindQuery(`
 		SELECT model_name,
@@ -206,7 +198,7 @@ func (s *LogAnalyticsService) GetModelStatistics(limit int) ([]map[string]interf
 		ORDER BY total_requests DESC
 		LIMIT ?`)
 
-	rows, err := s.logDB.QueryWithTimeout(30*time.Second, query, thirtyDaysAgo, limit)
+	rows, err := s.logDB.QueryWithTimeout(30*time.Second, query, thirtyDaysAgo, analyticsPrefetchLimit)
 	if err != nil {
 		return nil, err
 	}
@@ -230,36 +222,56 @@ func (s *LogAnalyticsService) GetModelStatistics(limit int) ([]map[string]interf
 		row["empty_rate"] = math.Round(emptyRate*100) / 100
 	}
 
-	cm.Set("analytics:model_statistics", rows, 5*time.Minute)
 	return rows, nil
 }
 
 // GetSummary returns analytics summary matching Python backend format
 // Frontend expects: state, user_request_ranking, user_quota_ranking, model_statistics
-func (s *LogAnalyticsService) GetSummary() (map[string]interface{}, error) {
+//
+// The summary is cached already encoded, for as long as the state it embeds, so
+// repeat requests skip assembling it from the four parts and encoding it again.
+func (s *LogAnalyticsService) GetSummary() (json.RawMessage, error) {
+	cm := cache.Get()
+	var cached json.RawMessage
+	if found, _ := cm.GetJSON("analytics:summary", &cached); found && len(cached) > 0 {
+		return cached, nil
+	}
+
 	state := s.GetAnalyticsState()
 
+	// A summary with a failed part is served but not cached.
+	complete := true
 	requestRanking, err := s.GetUserRequestRanking(10)
 	if err != nil {
-		requestRanking = []map[string]interface{}{}
+		requestRanking = []json.RawMessage{}
+		complete = false
 	}
 
 	quotaRanking, err := s.GetUserQuotaRanking(10)
 	if err != nil {
-		quotaRanking = []map[string]interface{}{}
+		quotaRanking = []json.RawMessage{}
+		complete = false
 	}
 
 	modelStats, err := s.GetModelStatistics(20)
 	if err != nil {
-		modelStats = []map[string]interface{}{}
+		modelStats = []json.RawMessage{}
+		complete = false
 	}
 
-	return map[string]interface{}{
+	data, err := json.Marshal(map[string]interface{}{
 		"state":                state,
 		"user_request_ranking": requestRanking,
 		"user_quota_ranking":   quotaRanking,
 		"model_statistics":     modelStats,
-	}, nil
+	})
+	if err != nil {
+		return nil, err
+	}
+	if complete {
+		cm.Set("analytics:summary", json.RawMessage(data), 60*time.Second)
+	}
+	return data, nil
 }
 
 // ProcessLogs clears caches and returns actual total count
@@ -362,6 +374,56 @@ func (s *LogAnalyticsService) CheckDataConsistency(autoReset bool) (map[string]i
 	}, nil
 }
 
+// analyticsFlight collapses concurrent cache misses for one list into a single
+// query. Right after /process or /reset clears the caches, the dashboard asks
+// for the summary and each list at once; they now share one aggregation over
+// the logs instead of each running its own.
+var analyticsFlight singleflight.Group
+
+// loadAnalyticsRows serves a cached list truncated to limit, running query at
+// most once across concurrent callers when the cache is cold.
+func loadAnalyticsRows(key string, limit int, query func() ([]map[string]interface{}, error)) ([]json.RawMessage, error) {
+	var cached []json.RawMessage
+	if found, _ := cache.Get().GetJSON(key, &cached); found && len(cached) > 0 {
+		return limitAnalyticsRows(cached, limit), nil
+	}
+
+	v, err, _ := analyticsFlight.Do(key, func() (interface{}, error) {
+		rows, err := query()
+		if err != nil {
+			return nil, err
+		}
+		return cacheAnalyticsRows(key, rows)
+	})
+	if err != nil {
+		return nil, err
+	}
+	return limitAnalyticsRows(v.([]json.RawMessage), limit), nil
+}
+
+// cacheAnalyticsRows encodes each row once and caches the encoded rows. Both
+// this result and later cache hits hand the response writer raw JSON, so rows
+// are neither rebuilt as maps nor re-encoded on every request.
+func cacheAnalyticsRows(key string, rows []map[string]interface{}) ([]json.RawMessage, error) {
+	encoded := make([]json.RawMessage, len(rows))
+	for i, row := range rows {
+		data, err := json.Marshal(row)
+		if err != nil {
+			return nil, err
+		}
+		encoded[i] = data
+	}
+	cache.Get().Set(key, encoded, 5*time.Minute)
+	return encoded, nil
+}
+
+func limitAnalyticsRows(rows []json.RawMessage, limit int) []json.RawMessage {
+	if limit > 0 && limit < len(rows) {
+		return rows[:limit]
+	}
+	return rows
+}
+
 // clearAllCaches removes all analytics-related caches
 func (s *LogAnalyticsService) clearAllCaches() {
 	cm := cache.Get()
@@ -369,6 +431,8 @@ func (s *LogAnalyticsService) clearAllCaches() {
 	cm.Delete("analytics:user_request_ranking")
 	cm.Delete("analytics:user_quota_ranking")
 	cm.Delete("analytics:model_statistics")
+	cm.Delete("analytics:log_stats")
+	cm.Delete("analytics:summary")
 	cm.Delete(analyticsStatePrefix)
 }
 
@@ -379,7 +443,19 @@ func (s *LogAnalyticsService) clearAllCaches() {
 //
 // The estimate is for the whole table — not filtered by `type IN (2,5)` — since the
 // dashboard/sync indicators only need a ballpark. Over-estimate is acceptable per CLAUDE.md.
+// Both values are cached for analyticsLogStatsTTL and dropped by clearAllCaches.
 func (s *LogAnalyticsService) getLogsApproxStats() (total int64, maxID int64) {
+	cm := cache.Get()
+	var cached [2]int64
+	if found, _ := cm.GetJSON("analytics:log_stats", &cached); found {
+		return cached[0], cached[1]
+	}
+	total, maxID = s.queryLogsApproxStats()
+	cm.Set("analytics:log_stats", [2]int64{total, maxID}, analyticsLogStatsTTL)
+	return total, maxID
+}
+
+func (s *LogAnalyticsService) queryLogsApproxStats() (total int64, maxID int64) {
 	if row, err := s.logDB.QueryOne(`SELECT COALESCE(MAX(id), 0) as max_id FROM logs`); err == nil && row != nil {
 		maxID = toInt64(row["max_id"])
 	}
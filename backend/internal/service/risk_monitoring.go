@@ -769,7 +769,7 @@ func analyzeIPSwitches(ipSequence []map[string]interface{}) map[string]interface
 	var rapidSwitches int64
 	var dualStackSwitches int64
 
-	var prevIP string
+	var prevIP, prevVersion string
 	var prevTime int64
 	var ipStartTime int64
 
@@ -782,6 +782,7 @@ func analyzeIPSwitches(ipSequence []map[string]interface{}) map[string]interface
 
 		if prevIP == "" {
 			prevIP = currentIP
+			prevVersion = getIPVersion(currentIP)
 			prevTime = currentTime
 			ipStartTime = currentTime
 			continue
@@ -790,14 +791,14 @@ func analyzeIPSwitches(ipSequence []map[string]interface{}) map[string]interface
 		if currentIP != prevIP {
 			switchInterval := currentTime - prevTime
 
-			prevVersion := getIPVersion(prevIP)
+			// The previous IP's version is carried over from the last switch, so
+			// each IP string is scanned once.
 			currVersion := getIPVersion(currentIP)
 
-			// Detect dual-stack switch (v4 <-> v6)
+			// Detect dual-stack switch (v4 <-> v6): versions are only ever "v4"/"v6",
+			// so differing versions is exactly a v4/v6 pair.
 			isDualStack := false
-			isV4V6Switch := (prevVersion == "v4" && currVersion == "v6") ||
-				(prevVersion == "v6" && currVersion == "v4")
-			if isV4V6Switch {
+			if prevVersion != currVersion {
 				// Simple heuristic: v4/v6 switch within 60s is likely dual-stack
 				if switchInterval <= 60 {
 					isDualStack = true
@@ -825,6 +826,7 @@ func analyzeIPSwitches(ipSequence []map[string]interface{}) map[string]interface
 			ipDurations[prevIP] = append(ipDurations[prevIP], ipDuration)
 
 			prevIP = currentIP
+			prevVersion = currVersion
 			ipStartTime = currentTime
 		}
 
@@ -395,7 +395,7 @@ func ExportTopUpsToCSV(ctx context.Context, w io.Writer, params ListTopUpParams)
 	}
 
 	db := database.Get()
-	whereSQL, args, _ := buildTopUpWhere(params)
+	whereSQL, args, argIdx := buildTopUpWhere(params)
 
 	// UTF-8 BOM so Excel (especially zh-CN locale) auto-detects encoding.
 	if _, err := w.Write([]byte{0xEF, 0xBB, 0xBF}); err != nil {
@@ -413,7 +413,11 @@ func ExportTopUpsToCSV(ctx context.Context, w io.Writer, params ListTopUpParams)
 		return err
 	}
 
-	selectSQL := fmt.Sprintf(`SELECT %s FROM top_ups t LEFT JOIN users u ON t.user_id = u.id WHERE %s ORDER BY t.create_time DESC`, topUpSelectColumns(), whereSQL)
+	// Cap the result set at the export limit too, so the database stops producing
+	// rows where the loop below stops reading them instead of streaming the rest.
+	selectSQL := fmt.Sprintf(`SELECT %s FROM top_ups t LEFT JOIN users u ON t.user_id = u.id WHERE %s ORDER BY t.create_time DESC LIMIT %s`,
+		topUpSelectColumns(), whereSQL, db.Placeholder(argIdx))
+	args = append(args, TopUpExportLimit)
 
 	rows, err := db.DB.QueryxContext(ctx, selectSQL, args...)
 	if err != nil {
@@ -18,6 +18,9 @@ func installSQLiteForTests(t *testing.T) *sqlx.DB {
 	if err != nil {
 		t.Fatalf("open sqlite: %v", err)
 	}
+	// Every connection to :memory: is a separate empty database; keep one so
+	// queries issued concurrently by a service still see the test schema.
+	db.SetMaxOpenConns(1)
 	database.SetForTesting(&database.Manager{DB: db, IsPG: false})
 	t.Cleanup(func() { _ = db.Close() })
 	return db
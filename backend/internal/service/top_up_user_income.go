@@ -183,7 +183,7 @@ func exportUserIncomeCSV(ctx context.Context, w io.Writer, params ListTopUpParam
 	}
 	userID := *params.UserID
 	db := database.Get()
-	whereSQL, args, _ := buildTopUpWhere(params)
+	whereSQL, args, argIdx := buildTopUpWhere(params)
 
 	if _, err := w.Write([]byte{0xEF, 0xBB, 0xBF}); err != nil {
 		return err
@@ -215,8 +215,9 @@ func exportUserIncomeCSV(ctx context.Context, w io.Writer, params ListTopUpParam
 
 	// ---- 在线充值行 ----
 	selectSQL := fmt.Sprintf(
-		`SELECT %s FROM top_ups t LEFT JOIN users u ON t.user_id = u.id WHERE %s ORDER BY t.create_time DESC`,
-		topUpSelectColumns(), whereSQL)
+		`SELECT %s FROM top_ups t LEFT JOIN users u ON t.user_id = u.id WHERE %s ORDER BY t.create_time DESC LIMIT %s`,
+		topUpSelectColumns(), whereSQL, db.Placeholder(argIdx))
+	args = append(args, TopUpExportLimit)
 	rows, err := db.DB.QueryxContext(ctx, selectSQL, args...)
 	if err != nil {
 		return fmt.Errorf("export top-ups query failed: %w", err)
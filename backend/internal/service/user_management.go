@@ -524,18 +524,47 @@ func (s *UserManagementService) GetSoftDeletedCount() (int64, error) {
 	return toInt64(row["count"]), nil
 }
 
+// purgeBatchSize caps how many users one purge round deletes, so the locks on
+// users and tokens are held per batch rather than for the whole purge and
+// other writers can interleave.
+const purgeBatchSize = 1000
+
 // PurgeSoftDeleted permanently deletes soft-deleted users
 func (s *UserManagementService) PurgeSoftDeleted(dryRun bool) (int64, error) {
 	if dryRun {
 		return s.GetSoftDeletedCount()
 	}
 
-	// Delete associated tokens first
-	s.db.Execute("DELETE FROM tokens WHERE user_id IN (SELECT id FROM users WHERE deleted_at IS NOT NULL)")
+	selectSQL := s.db.RebindStatic("SELECT id FROM users WHERE deleted_at IS NOT NULL ORDER BY id LIMIT ?")
+	var affected int64
+	for {
+		rows, err := s.db.Query(selectSQL, purgeBatchSize)
+		if err != nil {
+			return affected, err
+		}
+		if len(rows) == 0 {
+			break
+		}
 
-	affected, err := s.db.Execute("DELETE FROM users WHERE deleted_at IS NOT NULL")
-	if err != nil {
-		return 0, err
+		ph := make([]string, len(rows))
+		args := make([]interface{}, len(rows))
+		for i, row := range rows {
+			ph[i] = s.db.Placeholder(i + 1)
+			args[i] = toInt64(row["id"])
+		}
+		inClause := strings.Join(ph, ",")
+
+		// Delete associated tokens first
+		s.db.Execute(fmt.Sprintf("DELETE FROM tokens WHERE user_id IN (%s)", inClause), args...)
+
+		n, err := s.db.Execute(fmt.Sprintf("DELETE FROM users WHERE id IN (%s)", inClause), args...)
+		if err != nil {
+			return affected, err
+		}
+		affected += n
+		if n == 0 || len(rows) < purgeBatchSize {
+			break
+		}
 	}
 	logger.L.Business(fmt.Sprintf("已清理 %d 个软删除用户", affected))
 	return affected, nil
@@ -42,56 +42,15 @@ func (g *KeyGenerator) Generate(prefix string) (string, error) {
 		return "", fmt.Errorf("prefix must not exceed %d characters", MaxPrefixLength)
 	}
 
-	// Calculate random part length
-	randomLength := TargetKeyLength - len(prefix) - TimestampLength - CounterLength
-	if randomLength < 8 {
-		randomLength = 8
-	}
+	randomLength := randomPartLength(prefix)
 
 	// Generate random part
 	randomBytes := make([]byte, (randomLength/2)+1)
 	if _, err := rand.Read(randomBytes); err != nil {
 		return "", fmt.Errorf("failed to generate random bytes: %w", err)
 	}
-	randomPart := hex.EncodeToString(randomBytes)[:randomLength]
-
-	// Timestamp in base36 (milliseconds)
-	timestampMs := time.Now().UnixMilli()
-	timestampB36 := Base36Encode(timestampMs)
-	if len(timestampB36) > TimestampLength {
-		timestampB36 = timestampB36[len(timestampB36)-TimestampLength:]
-	}
-	for len(timestampB36) < TimestampLength {
-		timestampB36 = "0" + timestampB36
-	}
-
-	// Counter in base36
-	g.mu.Lock()
-	g.counter = (g.counter + 1) % 1679616 // 36^4
-	counterVal := g.counter
-	g.mu.Unlock()
 
-	counterB36 := Base36Encode(counterVal)
-	if len(counterB36) > CounterLength {
-		counterB36 = counterB36[len(counterB36)-CounterLength:]
-	}
-	for len(counterB36) < CounterLength {
-		counterB36 = "0" + counterB36
-	}
-
-	// Combine
-	key := prefix + randomPart + timestampB36 + counterB36
-
-	// Ensure exactly 32 characters
-	if len(key) > TargetKeyLength {
-		key = key[:TargetKeyLength]
-	} else if len(key) < TargetKeyLength {
-		for len(key) < TargetKeyLength {
-			key += "0"
-		}
-	}
-
-	return key, nil
+	return buildKey(prefix, randomBytes, randomLength, time.Now().UnixMilli(), g.nextCounters(1)), nil
 }
 
 // GenerateBatch creates a batch of unique keys
@@ -103,20 +62,34 @@ func (g *KeyGenerator) GenerateBatch(count int, prefix string) ([]string, error)
 		return nil, fmt.Errorf("prefix must not exceed %d characters", MaxPrefixLength)
 	}
 
-	keySet := make(map[string]struct{})
-	keys := make([]string, 0, count)
+	// Draw the randomness for the whole batch at once and share one timestamp;
+	// the counter still differs per key.
+	randomLength := randomPartLength(prefix)
+	chunk := (randomLength / 2) + 1
 	maxAttempts := count * 3
+	randomBytes := make([]byte, chunk*maxAttempts)
+	if _, err := rand.Read(randomBytes); err != nil {
+		return nil, fmt.Errorf("failed to generate random bytes: %w", err)
+	}
+	timestampMs := time.Now().UnixMilli()
+	counter := g.nextCounters(count)
 
-	for len(keys) < count && maxAttempts > 0 {
-		key, err := g.Generate(prefix)
-		if err != nil {
-			return nil, err
+	// Long prefixes push the timestamp and counter past the 32-character
+	// cut, leaving only the random part to tell keys apart, so duplicates are
+	// still checked for.
+	keySet := make(map[string]struct{}, count)
+	keys := make([]string, 0, count)
+
+	for attempt := 0; len(keys) < count && attempt < maxAttempts; attempt++ {
+		if attempt >= count {
+			counter = g.nextCounters(1)
 		}
+		key := buildKey(prefix, randomBytes[attempt*chunk:(attempt+1)*chunk], randomLength, timestampMs, counter)
+		counter = (counter + 1) % counterModulus
 		if _, exists := keySet[key]; !exists {
 			keySet[key] = struct{}{}
 			keys = append(keys, key)
 		}
-		maxAttempts--
 	}
 
 	if len(keys) < count {
@@ -126,6 +99,64 @@ func (g *KeyGenerator) GenerateBatch(count int, prefix string) ([]string, error)
 	return keys, nil
 }
 
+// counterModulus keeps the counter within CounterLength base36 digits (36^4).
+const counterModulus = 1679616
+
+// nextCounters reserves n consecutive counter values and returns the first.
+func (g *KeyGenerator) nextCounters(n int) int64 {
+	g.mu.Lock()
+	defer g.mu.Unlock()
+	first := (g.counter + 1) % counterModulus
+	g.counter = (g.counter + int64(n)) % counterModulus
+	return first
+}
+
+// randomPartLength is the number of hex characters left for the random part
+// once prefix, timestamp and counter are accounted for (at least 8).
+func randomPartLength(prefix string) int {
+	randomLength := TargetKeyLength - len(prefix) - TimestampLength - CounterLength
+	if randomLength < 8 {
+		randomLength = 8
+	}
+	return randomLength
+}
+
+// keyBufferLength fits the longest untruncated key: a maximal prefix, the
+// minimum random part, timestamp and counter.
+const keyBufferLength = MaxPrefixLength + 8 + TimestampLength + CounterLength
+
+// buildKey assembles a key from its parts in one buffer; randomBytes must hold
+// at least randomLength/2+1 bytes.
+func buildKey(prefix string, randomBytes []byte, randomLength int, timestampMs, counterVal int64) string {
+	var buf [keyBufferLength]byte
+	n := copy(buf[:], prefix)
+
+	// Random part in hex; the odd trailing character is overwritten below
+	hex.Encode(buf[n:], randomBytes[:randomLength/2+1])
+	n += randomLength
+
+	// Timestamp and counter in fixed-width base36
+	putBase36(buf[n:n+TimestampLength], timestampMs)
+	n += TimestampLength
+	putBase36(buf[n:n+CounterLength], counterVal)
+	n += CounterLength
+
+	// Ensure exactly 32 characters
+	for ; n < TargetKeyLength; n++ {
+		buf[n] = '0'
+	}
+	return string(buf[:TargetKeyLength])
+}
+
+// putBase36 writes the last len(dst) base36 digits of a non-negative n into
+// dst, zero-padded on the left, straight from the digit table.
+func putBase36(dst []byte, n int64) {
+	for i := len(dst) - 1; i >= 0; i-- {
+		dst[i] = base36Chars[n%36]
+		n /= 36
+	}
+}
+
 // Base36Encode encodes an integer to base36 string
 func Base36Encode(n int64) string {
 	if n == 0 {